@@ -1,50 +1,36 @@
 import streamlit as st
-import pdfplumber
-import fitz  # PyMuPDF
-import pandas as pd
+import importlib
 import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from datetime import datetime
 
+# pandas and the PDF stack (pdfplumber, fitz) are imported lazily: the page
+# and uploader render first, and reruns with the same uploads reuse the
+# results kept in session state instead of processing again.
+
 OUTPUT_DIR = "output"
+# One folder per session holding the current batch's highlighted PDFs; the
+# result cache is size-limited and may evict them mid-batch
+SESSION_DIR = os.path.join(OUTPUT_DIR, "sessions")
+# Folders left by ended sessions are removed once untouched for this long
+SESSION_MAX_AGE = 24 * 3600
+PREVIEW_ROWS = 1000
+# Highlight jobs a session keeps in the pool at once; the rest wait as
+# boxes and are submitted as earlier ones finish
+HIGHLIGHT_QUEUE = 4
+REVIEW_PAGE_SIZE = 12
+REVIEW_COLUMNS = 4
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 st.set_page_config(page_title="Invoice Coordinate Extraction", layout="wide")
 st.title("📄 Invoice Coordinate-Based Extraction (Bulk Supported)")
 
-# --------------------------------------------------
-# Helper Functions
-# --------------------------------------------------
-
-def extract_line(words, x_start, x_end, y_center, tolerance=6):
-    block = [
-        w for w in words
-        if w["x0"] >= x_start and w["x0"] <= x_end and
-           (y_center - tolerance) <= w["top"] <= (y_center + tolerance)
-    ]
-    text = " ".join(w["text"] for w in sorted(block, key=lambda w: w["x0"]))
-    return text, block
-
-
-def extract_block(words, x_start, x_end, y_start, y_end):
-    block = [
-        w for w in words
-        if w["x0"] >= x_start and w["x0"] <= x_end and
-           w["top"] >= y_start and w["bottom"] <= y_end
-    ]
-    text = " ".join(w["text"] for w in sorted(block, key=lambda w: (w["top"], w["x0"])))
-    return text, block
-
-
-def highlight_pdf(input_path, boxes, output_path):
-    doc = fitz.open(input_path)
-    page = doc[0]
-    for b in boxes:
-        rect = fitz.Rect(b["x0"], b["top"], b["x1"], b["bottom"])
-        page.add_highlight_annot(rect)
-    doc.save(output_path)
-    doc.close()
-
-
 # --------------------------------------------------
 # File Upload
 # --------------------------------------------------
@@ -55,127 +41,404 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-if uploaded_files:
+@st.cache_resource
+def preload_pdf_stack():
+    # Once per server process, in the background while the user picks files
+    thread = threading.Thread(target=importlib.import_module, args=("invoice_extractor",), daemon=True)
+    thread.start()
+    return thread
+
+
+preload_pdf_stack()
+
+
+@st.cache_resource
+def highlight_executor():
+    # Shared by all sessions; highlighting runs here, off the extraction path.
+    # Processes, not threads: PyMuPDF must not be used from several threads.
+    return ProcessPoolExecutor(max_workers=2)
 
-    all_data = []
-
-    for uploaded_file in uploaded_files:
-        st.info(f"Processing: {uploaded_file.name}")
-
-        temp_pdf_path = os.path.join(OUTPUT_DIR, uploaded_file.name)
-        with open(temp_pdf_path, "wb") as f:
-            f.write(uploaded_file.read())
-
-        with pdfplumber.open(temp_pdf_path) as pdf:
-            page = pdf.pages[0]
-            words = page.extract_words()
-
-        extracted = {}
-        highlight_boxes = []
-
-        # -----------------------
-        # Bill To
-        # -----------------------
-        x_start_bill, x_end_bill = 134, 290
-        for field, y in {"Name":166, "Email":191, "Phone":216}.items():
-            value, boxes = extract_line(words, x_start_bill, x_end_bill, y)
-            extracted[f"Bill To {field}"] = value
-            highlight_boxes.extend(boxes)
-
-        value, boxes = extract_block(words, x_start_bill, x_end_bill, 237, 286)
-        extracted["Bill To Address"] = value
-        highlight_boxes.extend(boxes)
-
-        # -----------------------
-        # Ship To
-        # -----------------------
-        x_start_ship, x_end_ship = 400, 555
-        for field, y in {"Name":166, "Email":191, "Phone":216}.items():
-            tol = 12 if field == "Name" else 6
-            value, boxes = extract_line(words, x_start_ship, x_end_ship, y, tolerance=tol)
-            extracted[f"Ship To {field}"] = value
-            highlight_boxes.extend(boxes)
-
-        value, boxes = extract_block(words, x_start_ship, x_end_ship, 237, 286)
-        extracted["Ship To Address"] = value
-        highlight_boxes.extend(boxes)
-
-        # Shipment Details
-        for field, y in {
-            "Est. Ship Date":333,
-            "Est. Weight(kg)":358,
-            "Transportation":385
-        }.items():
-            value, boxes = extract_line(words, 143, 288, y)
-            extracted[field] = value
-            highlight_boxes.extend(boxes)
-
-        # Carrier
-        carrier_words = [
-            w for w in words
-            if 134 <= w["x0"] <= 290 and 404 <= w["top"] <= 477
-        ]
-        carrier_sorted = sorted(carrier_words, key=lambda w: (w["top"], w["x0"]))
-        extracted["Carrier"] = " ".join(w["text"] for w in carrier_sorted)
-        highlight_boxes.extend(carrier_sorted)
-
-        # Invoice Info
-        for field, y in {
-            "Invoice #":333,
-            "Invoice Date":358,
-            "Due Date":385
-        }.items():
-            value, boxes = extract_line(words, 400, 555, y)
-            extracted[field] = value
-            highlight_boxes.extend(boxes)
-
-        # Payment & Totals
-        value, boxes = extract_line(words, 135, 288, 495)
-        extracted["Payment Method"] = value
-        highlight_boxes.extend(boxes)
-
-        value, boxes = extract_line(words, 135, 288, 563)
-        extracted["Shipper Name"] = value
-        highlight_boxes.extend(boxes)
-
-        value, boxes = extract_block(words, 135, 288, 580, 630)
-        extracted["Shipper Signature"] = value
-        highlight_boxes.extend(boxes)
-
-        financial_fields = {
-            "Subtotal": (495, 6),
-            "Tax ($)": (529, 12),
-            "Shipping ($)": (548, 6),
-            "Total Amount": (576, 8)
-        }
-
-        for field, (y, tol) in financial_fields.items():
-            value, boxes = extract_line(words, 400, 555, y_center=y, tolerance=tol)
-            extracted[field] = value
-            highlight_boxes.extend(boxes)
-
-        # Save highlighted PDF
-        highlight_name = f"highlighted_{uploaded_file.name}"
-        highlight_path = os.path.join(OUTPUT_DIR, highlight_name)
-        highlight_pdf(temp_pdf_path, highlight_boxes, highlight_path)
-
-        extracted["Source File"] = uploaded_file.name
-        all_data.append(extracted)
+
+@st.cache_resource
+def fitz_lock():
+    # Every PyMuPDF call made in this process (thumbnails, bundles, the
+    # profiler) holds this, since sessions run in threads of one server
+    return threading.Lock()
+
+
+def submit_highlight(pdf_bytes, boxes):
+    from invoice_extractor import timed_highlight
+
+    try:
+        return highlight_executor().submit(timed_highlight, pdf_bytes, boxes)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool
+        highlight_executor.clear()
+        return highlight_executor().submit(timed_highlight, pdf_bytes, boxes)
+
+
+def highlight_dir():
+    """This session's folder of highlighted PDFs, created (and stale ones swept) on first use."""
+    path = st.session_state.get("highlight_dir")
+    if path is None or not os.path.isdir(path):
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        cutoff = time.time() - SESSION_MAX_AGE
+        for name in os.listdir(SESSION_DIR):
+            old = os.path.join(SESSION_DIR, name)
+            if os.path.getmtime(old) < cutoff:
+                shutil.rmtree(old, ignore_errors=True)
+        path = st.session_state["highlight_dir"] = tempfile.mkdtemp(dir=SESSION_DIR)
+    return path
+
+
+def highlight_path(key):
+    return os.path.join(highlight_dir(), key.replace(":", "_") + ".pdf")
+
+
+def save_highlight(path, highlighted):
+    # Written aside and moved into place, so a download never reads half a file
+    with open(path + ".tmp", "wb") as f:
+        f.write(highlighted)
+    os.replace(path + ".tmp", path)
+
+
+def pump_highlights(jobs, cache, highlight_seconds):
+    """Save finished highlight jobs and submit waiting ones, keeping at most HIGHLIGHT_QUEUE in the pool."""
+    running = 0
+    for key, job in list(jobs.items()):
+        future = job["future"]
+        if future is None:
+            continue
+        if not future.done():
+            running += 1
+            continue
+        del jobs[key]
+        if future.exception() is None:
+            highlighted, highlight_seconds[key] = future.result()
+            cache.put(key, job["data"], highlighted)
+            save_highlight(job["path"], highlighted)
+    for job in jobs.values():
+        if running >= HIGHLIGHT_QUEUE:
+            break
+        if job["future"] is None:
+            # The upload keeps its bytes anyway; they are read again only now
+            job["future"] = submit_highlight(job["source"].getvalue(), job["boxes"])
+            running += 1
+
+
+@st.cache_resource
+def result_cache():
+    from invoice_extractor import ResultCache
+    return ResultCache(os.path.join(OUTPUT_DIR, "extraction_cache.sqlite"))
+
+
+@st.cache_data(max_entries=2000, show_spinner=False)
+def thumbnail(path):
+    # Rendered on first view only, from the session's highlighted PDF
+    from invoice_extractor import render_thumbnail
+
+    if not os.path.exists(path):
+        return None
+    with fitz_lock():
+        return render_thumbnail(path)
+
+
+def profile_invoice(pdf_bytes):
+    from invoice_extractor import extract_pdf, highlight_pdf
+
+    extracted, boxes = extract_pdf(pdf_bytes)
+    highlight_pdf(pdf_bytes, boxes)
+    return extracted
+
+
+def process_uploads(uploaded_files, template, cache, jobs, highlight_seconds):
+    """Extract every upload (cached ones are not re-extracted) and write the combined files. Returns the batch state."""
+    from invoice_extractor import CsvWriter, ExcelWriter, Timings, cache_key, iter_batch, ocr_available, split_line_items
+
+    timings = [Timings(uploaded_file.name) for uploaded_file in uploaded_files]
+
+    # Repeat uploads of the same invoice are served from the cache,
+    # or from this session's highlight jobs
+    results = [None] * len(uploaded_files)
+    keys = []
+    pending = []
+    for i, uploaded_file in enumerate(uploaded_files):
+        with timings[i].stage("upload"):
+            pdf_bytes = uploaded_file.getvalue()
+            keys.append(cache_key(pdf_bytes, template))
+            cached = cache.get(keys[i])
+        if cached is not None:
+            results[i] = {"data": cached[0], "error": None}
+            if cached[1] and not os.path.exists(highlight_path(keys[i])):
+                save_highlight(highlight_path(keys[i]), cached[1])
+        elif keys[i] in jobs:
+            results[i] = {"data": jobs[keys[i]]["data"], "error": None}
+        else:
+            pending.append((uploaded_file.name, pdf_bytes))
+
+    # Highlighted PDFs of earlier batches in this session are no longer offered
+    current = {highlight_path(key) for key in keys}
+    for name in os.listdir(highlight_dir()):
+        if os.path.join(highlight_dir(), name) not in current:
+            os.remove(os.path.join(highlight_dir(), name))
 
     # --------------------------------------------------
-    # Save Combined Excel
+    # Extract (all cores, in memory), streaming rows to disk
     # --------------------------------------------------
-    df = pd.DataFrame(all_data)
-    excel_path = os.path.join(OUTPUT_DIR, f"invoice_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-    df.to_excel(excel_path, index=False)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    excel_path = os.path.join(OUTPUT_DIR, f"invoice_data_{stamp}.xlsx")
+    # The CSV is flushed row by row, so a crash mid-batch still leaves partial results
+    csv_path = os.path.join(OUTPUT_DIR, f"invoice_data_{stamp}.csv")
+
+    progress = st.progress(0.0, text="Processing invoices...")
+    # Scans are OCR'd in their own small pool when Tesseract is installed
+    batch = iter_batch(pending, None, keep_boxes=True, ocr=ocr_available(),
+                       ocr_cache=os.path.join(OUTPUT_DIR, "ocr_cache.sqlite"))
+    # A single worker extracts in this process, where OCR renders pages with fitz
+    inline = min(os.cpu_count() or 1, len(pending)) == 1
+
+    preview = []
+    item_preview = []
+    errors = []
+    processed = 0
+    with ExcelWriter(excel_path) as excel_writer, CsvWriter(csv_path) as csv_writer:
+        for i, uploaded_file in enumerate(uploaded_files):
+            result = results[i]
+            if result is None:
+                # Pending files come back from the pool in upload order
+                with fitz_lock() if inline else nullcontext():
+                    result = next(batch)
+                if result["timings"]:
+                    timings[i].stages.update(result["timings"]["stages"])
+                    timings[i].matches.update(result["timings"]["matches"])
+                if not result["error"]:
+                    jobs[keys[i]] = {"data": result["data"], "source": uploaded_file, "boxes": result["boxes"],
+                                     "path": highlight_path(keys[i]), "future": None}
+            # Finished highlights go to the cache while extraction runs, so
+            # their bytes are never all held at once
+            pump_highlights(jobs, cache, highlight_seconds)
+
+            progress.progress((i + 1) / len(uploaded_files), text=f"Processed {i + 1}/{len(uploaded_files)}: {uploaded_file.name}")
+
+            if result["error"]:
+                errors.append((uploaded_file.name, result["error"]))
+                continue
+
+            # Table rows go to their own "Line Items" sheet
+            extracted, items = split_line_items(result["data"], uploaded_file.name)
+            extracted["Source File"] = uploaded_file.name
+            with timings[i].stage("output"):
+                excel_writer.write(extracted)
+                csv_writer.write(extracted)
+                for item in items:
+                    excel_writer.write(item, sheet="Line Items")
+            processed += 1
+            if len(preview) < PREVIEW_ROWS:
+                preview.append(extracted)
+            item_preview.extend(items[:PREVIEW_ROWS - len(item_preview)])
+    progress.empty()
+
+    return {
+        "keys": keys,
+        "excel_path": excel_path,
+        "preview": preview,
+        "item_preview": item_preview,
+        "errors": errors,
+        "processed": processed,
+        "timings": timings,
+    }
+
+
+if uploaded_files:
+    import pandas as pd
+    from invoice_extractor import (
+        load_template,
+        metrics_to_json,
+        metrics_to_prometheus,
+        open_bundle,
+        profile_call,
+    )
+    from invoice_extractor.normalize import normalize_frame, template_rules
+
+    template = load_template()
+    cache = result_cache()
+    # cache key -> {"data", "source" (the upload), "boxes", "path", "future"},
+    # in submission order; "future" is None until a slot in the pool is free
+    jobs = st.session_state.setdefault("highlight_jobs", {})
+    # cache key -> seconds spent highlighting, for the Performance panel
+    highlight_seconds = st.session_state.setdefault("highlight_seconds", {})
+
+    # Widget interactions rerun the script; only a new set of uploads is processed again
+    upload_ids = [uploaded_file.file_id for uploaded_file in uploaded_files]
+    state = st.session_state.get("batch")
+    if state is None or state["upload_ids"] != upload_ids:
+        state = process_uploads(uploaded_files, template, cache, jobs, highlight_seconds)
+        state["upload_ids"] = upload_ids
+        # Typed view: money/date/... columns parsed and each row checked (Valid / Validation)
+        state["typed_preview"] = normalize_frame(pd.DataFrame(state["preview"]), *template_rules([template]))
+        st.session_state["batch"] = state
+
+    keys = state["keys"]
+    paths = [highlight_path(key) for key in keys]
+    timings = state["timings"]
+    preview = state["preview"]
+    item_preview = state["item_preview"]
+    processed = state["processed"]
+    excel_path = state["excel_path"]
+    for name, error in state["errors"]:
+        st.error(f"Failed: {name} ({error})")
 
     # --------------------------------------------------
     # UI Output
     # --------------------------------------------------
     st.subheader("📊 Extracted Invoice Data")
-    st.dataframe(df)
+    typed_preview = state["typed_preview"]
+    st.dataframe(typed_preview)
+    invalid = int((~typed_preview["Valid"]).sum()) if preview else 0
+    if invalid:
+        st.warning(f"{invalid} invoice(s) failed validation; see the Validation column.")
+    unsure = sum(1 for row in preview if row.get("Low Confidence"))
+    if unsure:
+        st.warning(f"{unsure} invoice(s) have low-confidence fields; see the Low Confidence column.")
+    if processed > len(preview):
+        st.caption(f"Showing the first {len(preview)} of {processed} rows; download the Excel file for all of them.")
+    if item_preview:
+        st.subheader("🧾 Line Items")
+        st.dataframe(pd.DataFrame(item_preview))
 
     with open(excel_path, "rb") as f:
         st.download_button("⬇️ Download Combined Excel", f, file_name="invoice_data.xlsx")
 
-    st.success("✅ All invoices processed successfully!")
\ No newline at end of file
+    st.success(f"✅ {processed} of {len(uploaded_files)} invoices processed successfully!")
+
+    # --------------------------------------------------
+    # Highlighted PDFs (filled in as background jobs finish)
+    # --------------------------------------------------
+    def build_bundle(ext, files):
+        # The bundle is written to a temporary file one PDF at a time, then
+        # handed over as bytes (Streamlit keeps downloads in memory whatever
+        # the callable returns) and removed, so clicks leave nothing behind
+        fd, bundle_path = tempfile.mkstemp(prefix="highlighted_", suffix=f".{ext}", dir=OUTPUT_DIR)
+        os.close(fd)
+        # Runs on a download thread of its own. Only merged PDFs use fitz,
+        # and the lock is taken per file so other sessions are not stalled
+        lock = fitz_lock() if ext == "pdf" else nullcontext()
+        try:
+            with lock:
+                bundle = open_bundle(bundle_path)
+            try:
+                for name, path in files:
+                    if os.path.exists(path):
+                        with lock:
+                            bundle.add(f"highlighted_{name}", path)
+            finally:
+                with lock:
+                    bundle.close()
+            with open(bundle_path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(bundle_path)
+
+    def highlighted_pdf(path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def show_highlights():
+        # run_every is fixed by the full run that created this fragment
+        polling = bool(jobs)
+        pump_highlights(jobs, cache, highlight_seconds)
+        if polling and not jobs:
+            # Everything is highlighted: rerun the app to stop the polling
+            st.rerun(scope="app")
+
+        st.subheader("🖍️ Download Highlighted PDFs")
+        ready = []
+        missing = []
+        for i, (uploaded_file, key, path) in enumerate(zip(uploaded_files, keys, paths)):
+            if key in jobs:
+                st.caption(f"⏳ Highlighting {uploaded_file.name}...")
+                continue
+            if not os.path.exists(path):
+                missing.append(uploaded_file.name)
+                continue
+            ready.append((uploaded_file.name, path))
+            st.download_button(
+                label=f"Download highlighted_{uploaded_file.name}",
+                # Read from the session folder only when clicked
+                data=lambda path=path: highlighted_pdf(path),
+                file_name=f"highlighted_{uploaded_file.name}",
+                mime="application/pdf",
+                key=f"pdf_dl_{i}",
+                on_click="ignore",
+            )
+
+        if missing:
+            st.warning(f"{len(missing)} invoice(s) could not be highlighted and are left out of the downloads: "
+                       + ", ".join(missing))
+        if not jobs:
+            bundle_format = st.radio("Bundle as", ["ZIP", "Merged PDF"], horizontal=True, key="bundle_format")
+            ext = "zip" if bundle_format == "ZIP" else "pdf"
+            st.download_button(
+                f"⬇️ Download all highlighted PDFs ({bundle_format})",
+                # Built only when clicked, one PDF at a time from the session folder into a file under output/
+                data=lambda: build_bundle(ext, ready),
+                file_name=f"highlighted_invoices.{ext}",
+                mime="application/zip" if ext == "zip" else "application/pdf",
+                key="bundle_dl",
+                on_click="ignore",
+            )
+
+        # --------------------------------------------------
+        # Review (thumbnails of the highlighted first pages)
+        # --------------------------------------------------
+        if st.toggle("🔍 Review mode", key="review_mode"):
+            page_count = max(1, -(-len(ready) // REVIEW_PAGE_SIZE))
+            page = st.number_input("Page", 1, page_count, key="review_page") if page_count > 1 else 1
+            columns = st.columns(REVIEW_COLUMNS)
+            start = (page - 1) * REVIEW_PAGE_SIZE
+            for n, (name, path) in enumerate(ready[start:start + REVIEW_PAGE_SIZE]):
+                png = thumbnail(path)
+                if png is not None:
+                    columns[n % REVIEW_COLUMNS].image(png, caption=name)
+
+        # --------------------------------------------------
+        # Performance
+        # --------------------------------------------------
+        with st.expander("⏱️ Performance"):
+            records = []
+            for t, key in zip(timings, keys):
+                record = t.as_dict()
+                if key in highlight_seconds:
+                    record["stages"]["highlight"] = highlight_seconds[key]
+                records.append(record)
+
+            stage_ms = pd.DataFrame(
+                [{"File": r["file"], **{k: v * 1000 for k, v in r["stages"].items()}} for r in records]
+            ).fillna(0.0)
+            st.caption("Milliseconds per stage (cached invoices only show the upload stage)")
+            st.dataframe(stage_ms.round(2))
+            st.caption("Words matched per field")
+            st.dataframe(pd.DataFrame([{"File": r["file"], **r["matches"]} for r in records if r["matches"]]))
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("Metrics (JSON)", metrics_to_json(records), file_name="metrics.json", key="metrics_json")
+            with col2:
+                st.download_button("Metrics (Prometheus)", metrics_to_prometheus(records), file_name="metrics.prom", key="metrics_prom")
+
+            names = [f.name for f in uploaded_files]
+            profile_name = st.selectbox("Profile a single invoice", names, key="profile_name")
+            engine = st.radio("Profiler", ["cprofile", "pyinstrument"], horizontal=True, key="profile_engine")
+            if st.button("Run profiler", key="profile_run"):
+                pdf_bytes = uploaded_files[names.index(profile_name)].getvalue()
+                try:
+                    with fitz_lock():
+                        _, report = profile_call(profile_invoice, pdf_bytes, engine=engine)
+                    st.code(report)
+                except ImportError:
+                    st.warning("pyinstrument is not installed (pip install pyinstrument)")
+
+    st.fragment(run_every=1.0 if jobs else None)(show_highlights)()
@@ -0,0 +1,89 @@
+"""
+Compare the pdfplumber and PyMuPDF word backends.
+
+    python benchmarks/bench_backends.py [PDF] [--repeat N]
+
+First checks that both backends give the same template fields and the
+same word boxes (within --tolerance points) for every word whose text
+they agree on, then times open + word extraction + template for each.
+Exits with status 1 if the backends disagree.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from invoice_extractor import WordIndex, extract_invoice, open_source
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SampleInvoice.pdf")
+
+
+def run(pdf_path, backend):
+    with open_source(pdf_path, backend) as source:
+        words = source.words(0)
+    extracted, _ = extract_invoice(WordIndex(words))
+    return words, extracted
+
+
+def compare_words(reference, candidate, tolerance):
+    """Largest coordinate difference over words both backends read with the same text."""
+    by_text = {}
+    for w in candidate:
+        by_text.setdefault(w["text"], []).append(w)
+
+    worst = 0.0
+    matched = 0
+    for w in reference:
+        options = by_text.get(w["text"])
+        if not options:
+            continue
+        best = min(options, key=lambda c: abs(c["x0"] - w["x0"]) + abs(c["top"] - w["top"]))
+        diff = max(abs(best[k] - w[k]) for k in ("x0", "top", "x1", "bottom"))
+        worst = max(worst, diff)
+        matched += diff <= tolerance
+    return matched, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", default=SAMPLE_PDF)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # --------------------------------------------------
+    # Equivalence
+    # --------------------------------------------------
+    ref_words, ref_fields = run(args.pdf, "pdfplumber")
+    mu_words, mu_fields = run(args.pdf, "pymupdf")
+
+    ok = True
+    for field, value in ref_fields.items():
+        if mu_fields.get(field) != value:
+            ok = False
+            print(f"MISMATCH {field!r}: pdfplumber={value!r} pymupdf={mu_fields.get(field)!r}")
+
+    matched, worst = compare_words(ref_words, mu_words, args.tolerance)
+    print(f"Fields: {'identical' if ok else 'DIFFERENT'} ({len(ref_fields)} fields)")
+    print(f"Words:  {matched}/{len(ref_words)} within {args.tolerance}pt (worst diff {worst:.3f}pt)")
+
+    # --------------------------------------------------
+    # Timing
+    # --------------------------------------------------
+    timings = {}
+    for backend in ("pdfplumber", "pymupdf"):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            run(args.pdf, backend)
+        timings[backend] = (time.perf_counter() - start) / args.repeat
+        print(f"{backend:<11} {timings[backend] * 1000:8.2f} ms/invoice")
+
+    print(f"Speedup: {timings['pdfplumber'] / timings['pymupdf']:.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
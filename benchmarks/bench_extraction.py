@@ -0,0 +1,182 @@
+"""
+Extraction throughput / latency benchmark on synthetic invoices.
+
+    python benchmarks/bench_extraction.py -n 200 --filler 400 -o bench.json
+    python benchmarks/bench_extraction.py -n 200 --compare bench.json
+
+Per invoice it times word extraction, the single-field helpers
+(extract_line / extract_block), the compiled template and highlight_pdf;
+then the whole batch is exported with ExcelWriter. Reports p50/p99/mean
+per stage, pages/sec, invoices/sec and peak RSS, and saves them as JSON.
+With --compare, exits with status 1 if any stage's p50 got slower than
+the saved run by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from invoice_extractor import (
+    ExcelWriter,
+    PageIndexes,
+    extract_block,
+    extract_line,
+    highlight_pdf,
+    load_template,
+    open_source,
+)
+from synthetic import make_invoice
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of floats."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_helpers(index, definition):
+    """The per-field helper path: one extract_line / extract_block call per field."""
+    extracted = {}
+    for f in definition["fields"]:
+        if f["type"] == "line":
+            extracted[f["name"]], _ = extract_line(index, f["x"][0], f["x"][1], f["y"], f.get("tol", 6))
+        else:
+            extracted[f["name"]], _ = extract_block(index, f["x"][0], f["x"][1], f["y"][0], f["y"][1])
+    return extracted
+
+
+def summarize(samples):
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "total_s": sum(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--invoices", type=int, default=100)
+    parser.add_argument("--filler", type=int, default=0, help="Extra fine-print words per page")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per invoice (extra pages hold filler only)")
+    parser.add_argument("-b", "--backend", default="pdfplumber")
+    parser.add_argument("--full-page", action="store_true", help="Parse whole pages instead of only the template's regions")
+    parser.add_argument("-o", "--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs --compare (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    template = load_template()
+    invoices = [
+        make_invoice(template, seed=i, filler_words=args.filler, extra_pages=args.pages - 1)
+        for i in range(args.invoices)
+    ]
+
+    stages = {"words": [], "helpers": [], "template": [], "highlight": []}
+    rows = []
+    pages_read = 0
+    mismatches = 0
+    low_confidence = 0
+    start = time.perf_counter()
+
+    for pdf_bytes, expected in invoices:
+        t0 = time.perf_counter()
+        with open_source(pdf_bytes, args.backend) as source:
+            pages = PageIndexes(source, clip=None if args.full_page else template.page_clip)
+            page_count = len(pages)
+            for page_no in range(page_count):
+                pages[page_no]
+        pages_read += page_count
+        # Every page is indexed now, so the stages below never touch the source
+        t1 = time.perf_counter()
+        run_helpers(pages[0], template.definition)
+        t2 = time.perf_counter()
+        extracted, boxes = template.extract([pages[page_no] for page_no in range(page_count)])
+        t3 = time.perf_counter()
+        highlight_pdf(pdf_bytes, boxes)
+        t4 = time.perf_counter()
+
+        stages["words"].append(t1 - t0)
+        stages["helpers"].append(t2 - t1)
+        stages["template"].append(t3 - t2)
+        stages["highlight"].append(t4 - t3)
+        mismatches += any(extracted[name] != value for name, value in expected.items())
+        low_confidence += bool(extracted["Low Confidence"])
+        rows.append(extracted)
+
+    elapsed = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        with ExcelWriter(os.path.join(tmp, "bench.xlsx")) as writer:
+            for row in rows:
+                writer.write(row)
+        excel_s = time.perf_counter() - t0
+
+    results = {
+        "meta": {
+            "invoices": args.invoices,
+            "pages_per_invoice": args.pages,
+            "filler_words": args.filler,
+            "backend": args.backend,
+            "full_page": args.full_page,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": {name: summarize(samples) for name, samples in stages.items()},
+        "excel_export_s": excel_s,
+        "pages_per_sec": pages_read / elapsed,
+        "invoices_per_sec": args.invoices / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "mismatches": mismatches,
+        "low_confidence": low_confidence,
+    }
+
+    print(f"{'stage':<10} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for name, s in results["stages"].items():
+        print(f"{name:<10} {s['p50_ms']:9.3f} {s['p99_ms']:9.3f} {s['mean_ms']:9.3f}")
+    print(f"excel export: {excel_s:.3f}s for {len(rows)} rows")
+    rss = results["peak_rss_mb"]
+    print(f"{results['pages_per_sec']:.1f} pages/s, {results['invoices_per_sec']:.1f} invoices/s, "
+          f"peak RSS {'n/a' if rss is None else f'{rss:.1f} MB'}")
+    if mismatches:
+        print(f"WARNING: {mismatches} invoices did not match their expected fields")
+    if low_confidence:
+        print(f"{low_confidence} invoices had low-confidence fields")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        for name, s in results["stages"].items():
+            before = previous["stages"].get(name)
+            if before and s["p50_ms"] > before["p50_ms"] * (1 + args.threshold):
+                status = 1
+                print(f"REGRESSION {name}: p50 {before['p50_ms']:.3f} -> {s['p50_ms']:.3f} ms")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
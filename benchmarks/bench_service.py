@@ -0,0 +1,75 @@
+"""
+Latency of the HTTP service under concurrent load.
+
+    python -m invoice_extractor.service -j 4 &
+    python benchmarks/bench_service.py -n 200 -c 8
+
+Posts the same PDF -n times to /extract from -c client threads and reports
+p50/p99 latency and requests/sec. --cold N also times N fresh
+`python -c "extract_pdf(...)"` processes, i.e. what a request would cost
+without the warm worker pool.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLE_PDF = os.path.join(ROOT, "SampleInvoice.pdf")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def post(url, pdf_bytes):
+    request = urllib.request.Request(url, data=pdf_bytes, headers={"Content-Type": "application/pdf"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def cold_run(pdf_path):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"from invoice_extractor import extract_pdf; extract_pdf({pdf_path!r})"],
+        check=True, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pdf", default=SAMPLE_PDF)
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--cold", type=int, default=0, help="Also time this many cold single-PDF processes")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    url = args.url.rstrip("/") + "/extract"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+        latencies = list(clients.map(lambda _: post(url, pdf_bytes), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent: "
+          f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+          f"{args.requests / elapsed:.1f} req/s")
+    if args.cold:
+        cold = [cold_run(os.path.abspath(args.pdf)) for _ in range(args.cold)]
+        print(f"cold process per PDF: p50 {percentile(cold, 50) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Line-item table benchmark: synthetic invoices with long item tables.
+
+    python benchmarks/bench_tables.py --rows 200 --pages 3 -n 20
+
+Each page carries --rows item rows (every 7th with a wrapped second
+description line). The table is read with CompiledTable's single sweep and,
+for comparison, with a naive pass that rescans the page's words once per
+row. Both must reproduce the drawn rows.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from invoice_extractor import CompiledTemplate, PageIndexes, open_source
+from synthetic import PAGE_HEIGHT, PAGE_WIDTH, VOCABULARY
+
+ROW_PITCH = 3.4
+FONT_SIZE = 3
+
+TABLE_TEMPLATE = {
+    "name": "bench_items",
+    "fields": [],
+    "tables": [{
+        "name": "Line Items",
+        "page": "every",
+        "y": [20, 820],
+        "columns": [
+            {"name": "Description", "x": 30},
+            {"name": "Qty", "x": 300},
+            {"name": "Unit Price", "x": 380},
+            {"name": "Amount", "x": 470},
+        ],
+        "x_end": 570,
+        "key": "Amount",
+    }],
+}
+
+
+def make_table_invoice(rows, pages, seed):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    expected = []
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = 30
+        for n in range(rows):
+            description = " ".join(rng.choice(VOCABULARY) for _ in range(3))
+            qty, price = rng.randint(1, 40), rng.randint(1, 900)
+            for x, text in ((32, description), (302, str(qty)), (382, f"{price}.00"), (472, f"{qty * price}.00")):
+                page.insert_text((x, y), text, fontsize=FONT_SIZE)
+            if n % 7 == 0:
+                y += ROW_PITCH
+                wrapped = rng.choice(VOCABULARY)
+                page.insert_text((32, y), wrapped, fontsize=FONT_SIZE)
+                description += " " + wrapped
+            y += ROW_PITCH
+            expected.append({"Description": description, "Qty": str(qty),
+                             "Unit Price": f"{price}.00", "Amount": f"{qty * price}.00"})
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes, expected
+
+
+def naive_rows(index, table):
+    """Reference: find baselines, then rescan every word for each row and column."""
+    words = [w for w in index.words if table.y_start <= w["top"] <= table.y_end]
+    baselines = []
+    for b in sorted(w["bottom"] for w in words):
+        if not baselines or b - baselines[-1] > table.row_tol:
+            baselines.append(b)
+    edges = list(table.edges) + [table.x_end]
+    rows = []
+    for b in baselines:
+        row = {}
+        for k, name in enumerate(table.columns):
+            cell = sorted(
+                (w for w in words if 0 <= w["bottom"] - b <= table.row_tol and edges[k] <= w["x0"] < edges[k + 1]),
+                key=lambda w: w["x0"],
+            )
+            row[name] = " ".join(w["text"] for w in cell)
+        if rows and not row[table.columns[table.key_column]]:
+            for name in table.columns:
+                rows[-1][name] = " ".join(t for t in (rows[-1][name], row[name]) if t)
+        else:
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--invoices", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200, help="Item rows per page")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("-b", "--backend", default="pdfplumber")
+    args = parser.parse_args()
+
+    template = CompiledTemplate(TABLE_TEMPLATE)
+    table = template.tables[0]
+    sweep_s = naive_s = 0.0
+    mismatches = 0
+
+    for seed in range(args.invoices):
+        pdf_bytes, expected = make_table_invoice(args.rows, args.pages, seed)
+        with open_source(pdf_bytes, args.backend) as source:
+            pages = PageIndexes(source)
+            indexes = [pages[page_no] for page_no in range(len(pages))]
+
+        t0 = time.perf_counter()
+        extracted, _ = template.extract(indexes)
+        t1 = time.perf_counter()
+        naive = [row for index in indexes for row in naive_rows(index, table)]
+        t2 = time.perf_counter()
+
+        sweep_s += t1 - t0
+        naive_s += t2 - t1
+        mismatches += extracted["Line Items"] != expected or naive != expected
+
+    rows = args.invoices * args.pages * args.rows
+    print(f"{rows} rows: sweep {sweep_s * 1000 / args.invoices:.2f} ms/invoice, "
+          f"naive rescan {naive_s * 1000 / args.invoices:.2f} ms/invoice ({naive_s / sweep_s:.1f}x)")
+    if mismatches:
+        print(f"WARNING: {mismatches} invoices did not match their expected rows")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
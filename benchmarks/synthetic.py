@@ -0,0 +1,100 @@
+"""
+Synthetic invoices drawn with PyMuPDF at a template's field coordinates.
+
+    from synthetic import make_invoice
+    pdf_bytes, expected = make_invoice(load_template(), seed=7)
+
+Every field gets random words placed so that pdfplumber reads them back
+inside the field's region; `expected` holds that text. The template's
+anchor labels are drawn at their positions too. Optional filler
+words land in the footer, below every region, to make pages denser
+without changing the expected values. (Fine print beside a field would
+be merged into its lines by pdfplumber's line clustering.)
+
+drift_page() moves and scales a page as a misaligned scanner or printer
+would, for exercising calibration.
+"""
+
+import random
+
+import fitz  # PyMuPDF
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+FONT_SIZE = 10
+BASELINE_OFFSET = 8    # insert_text() takes the baseline; pdfplumber top ≈ baseline - 8 at size 10
+LINE_HEIGHT = 11
+CHAR_WIDTH = 5.6       # rough Helvetica advance at size 10, used to keep text inside x ranges
+
+VOCABULARY = (
+    "invoice freight pallet express ground north south east west harbor "
+    "logistics supply parts order shipment account credit check wire "
+    "steel cotton paper glass copper timber cargo depot station terminal"
+).split()
+
+
+def _words(rng, max_chars):
+    out = []
+    while True:
+        word = rng.choice(VOCABULARY)
+        if len(" ".join(out + [word])) > max_chars:
+            return out or [word[:max_chars]]
+        out.append(word)
+        if rng.random() < 0.3:
+            return out
+
+
+def _filler(page, rng, count):
+    # Footer only: below every region of the built-in template
+    for _ in range(count):
+        x, y = rng.uniform(20, 520), rng.uniform(660, 800)
+        page.insert_text((x, y), rng.choice(VOCABULARY), fontsize=6)
+
+
+def make_invoice(template, seed=0, filler_words=0, extra_pages=0):
+    """Return (pdf_bytes, expected field dict) for one synthetic invoice."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    expected = {}
+
+    for field in template.definition["fields"]:
+        x_start, x_end = field["x"]
+        x = x_start + 4
+        max_chars = int((x_end - x - 4) / CHAR_WIDTH)
+
+        if field["type"] == "line":
+            tops = [field["y"] + rng.uniform(-1, 1)]
+        else:
+            y_start, y_end = field["y"]
+            count = rng.randint(1, max(1, int((y_end - y_start - 2) // LINE_HEIGHT)))
+            tops = [y_start + 1 + k * LINE_HEIGHT for k in range(count)]
+
+        lines = []
+        for top in tops:
+            text = " ".join(_words(rng, max_chars))
+            page.insert_text((x, top + BASELINE_OFFSET), text, fontsize=FONT_SIZE)
+            lines.append(text)
+        expected[field["name"]] = " ".join(lines)
+
+    for anchor in template.definition.get("anchors", []):
+        page.insert_text((anchor["x"], anchor["y"] + BASELINE_OFFSET), anchor["text"], fontsize=FONT_SIZE)
+
+    _filler(page, rng, filler_words)
+    for _ in range(extra_pages):
+        _filler(doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT), rng, filler_words)
+
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes, expected
+
+
+def drift_page(pdf_bytes, dx=0.0, dy=0.0, scale=1.0):
+    """The first page of pdf_bytes drawn dx, dy points further right and down, scaled about its top-left corner."""
+    src = fitz.open(stream=pdf_bytes, filetype="pdf")
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.show_pdf_page(fitz.Rect(dx, dy, dx + PAGE_WIDTH * scale, dy + PAGE_HEIGHT * scale), src, 0)
+    drifted = doc.tobytes()
+    doc.close()
+    src.close()
+    return drifted
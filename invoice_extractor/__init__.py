@@ -0,0 +1,33 @@
+"""Shared extraction helpers for the SA-Hive invoice apps."""
+
+from invoice_extractor.instrumentation import Timings, metrics_to_json, metrics_to_prometheus, profile_call
+from invoice_extractor.word_index import PageIndexes, Word, WordIndex, box_array
+from invoice_extractor.backends import BACKENDS, NoTextLayerError, PdfplumberSource, PymupdfSource, open_source
+from invoice_extractor.ocr import OcrSource, ocr_available
+from invoice_extractor.calibration import calibrate, fit_affine
+from invoice_extractor.template import CompiledTable, CompiledTemplate, load_template
+from invoice_extractor.routing import TemplateRouter, load_router
+from invoice_extractor.extraction import (
+    extract_line,
+    extract_block,
+    highlight_pdf,
+    merge_boxes,
+    render_thumbnail,
+    extract_invoice,
+    extract_pdf,
+    process_invoice,
+)
+from invoice_extractor.anchors import AnchorIndex
+from invoice_extractor.labels import extract_labelled_invoice
+from invoice_extractor.batch import iter_batch, run_batch, timed_highlight
+from invoice_extractor.cache import ResultCache, cache_key
+from invoice_extractor.bundle import MergedPdfBundle, ZipBundle, open_bundle
+from invoice_extractor.writers import (
+    CsvWriter,
+    ExcelWriter,
+    JsonlWriter,
+    ParquetWriter,
+    RollingWriter,
+    open_writer,
+    split_line_items,
+)
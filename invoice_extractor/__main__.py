@@ -0,0 +1,6 @@
+import sys
+
+from invoice_extractor.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import numpy as np
+
+from invoice_extractor.word_index import WordIndex
+
+LINE_TOLERANCE = 3
+
+
+class AnchorIndex:
+    """
+    Label lookups for one page, built once instead of scanning every word
+    per label:
+
+      - a lowercase text -> word positions hash index, and
+      - a line index: word positions clustered into lines by top (within
+        LINE_TOLERANCE) in one sorted sweep, each line ordered by x0,
+
+    so multi-word labels such as "Invoice Date" resolve by walking along the
+    line from each hit of their first word. Values next to a label come from
+    the underlying WordIndex's vertical bands. Words are handled as
+    positions in that index; index.boxes() turns them into highlight boxes.
+    """
+
+    def __init__(self, words):
+        self.index = index = words if isinstance(words, WordIndex) else WordIndex(words)
+        x0 = index.x0.tolist()
+
+        self.lines = []
+        self._by_text = {}    # lowercase text -> [(line_no, column)]
+        line_top = None
+        for j, top in enumerate(index.top.tolist()):
+            if line_top is None or top - line_top > LINE_TOLERANCE:
+                self.lines.append([])
+                line_top = top
+            self.lines[-1].append(j)
+
+        for line_no, line in enumerate(self.lines):
+            line.sort(key=x0.__getitem__)
+            for column, j in enumerate(line):
+                self._by_text.setdefault(index.text[j].lower(), []).append((line_no, column))
+
+    def find(self, label_text):
+        """
+        Every occurrence of label_text (one or more words, case-insensitive)
+        in reading order. Each hit is a word-like dict (x0, top, x1, bottom,
+        text) spanning the whole label, with its word positions under
+        "positions".
+        """
+        index = self.index
+        tokens = label_text.lower().split()
+        hits = []
+        for line_no, column in self._by_text.get(tokens[0], ()):
+            positions = self.lines[line_no][column:column + len(tokens)]
+            if [index.text[j].lower() for j in positions] != tokens:
+                continue
+            hits.append({
+                "text": index.join(positions),
+                "x0": float(index.x0[positions[0]]),
+                "x1": float(index.x1[positions[-1]]),
+                "top": float(index.top[positions].min()),
+                "bottom": float(index.bottom[positions].max()),
+                "positions": positions,
+            })
+        return hits
+
+    def right_of(self, hit, tolerance=5, x_end=None):
+        """(text, positions) of the words level with the label (|top diff| < tolerance) to its right, up to x_end."""
+        index = self.index
+        lo, hi = index.band_range(hit["top"] - tolerance, hit["top"] + tolerance)
+        x0 = index.x0[lo:hi]
+        keep = (np.abs(index.top[lo:hi] - hit["top"]) < tolerance) & (x0 > hit["x1"])
+        if x_end is not None:
+            keep &= x0 < x_end
+        positions = lo + np.flatnonzero(keep)
+        return index.join(positions), positions
+
+    def from_x(self, x_start, y_start, height=20):
+        """(text, positions) of the words from x_start rightwards whose top lies in [y_start, y_start + height]."""
+        index = self.index
+        lo, hi = index.band_range(y_start, y_start + height)
+        positions = lo + np.flatnonzero(index.x0[lo:hi] >= x_start)
+        return index.join(positions), positions
+
+    def same_line_after(self, hit, label_text):
+        """x0 of the next occurrence of label_text on the hit's line, or None."""
+        for other in self.find(label_text):
+            if other["x0"] > hit["x1"] and abs(other["top"] - hit["top"]) <= LINE_TOLERANCE:
+                return other["x0"]
+        return None
@@ -0,0 +1,160 @@
+import pdfplumber
+import fitz  # PyMuPDF
+import io
+from pdfminer.layout import LTChar, LTContainer
+
+
+def open_fitz(pdf):
+    """Open a PDF with PyMuPDF from a path or from in-memory bytes."""
+    if isinstance(pdf, bytes):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(pdf)
+
+
+class NoTextLayerError(ValueError):
+    """The PDF has no extractable words (usually a scan); OCR is needed to read it."""
+
+
+# --------------------------------------------------
+# Word Sources
+# --------------------------------------------------
+# A word source opens a PDF once and returns pdfplumber-style word dicts
+# (text, x0, top, x1, bottom) per page, so the extraction code does not
+# care which library parsed the file. Sources accept a file path or the
+# raw PDF bytes, so uploads never have to touch the disk.
+# words() may be given a clip (x0, top, x1, bottom) in page points; only
+# characters inside it are turned into words. Bounds may be inf.
+
+def clamp_clip(clip, bbox):
+    """Intersection of a clip with a page's (x0, top, x1, bottom) bbox."""
+    return (max(clip[0], bbox[0]), max(clip[1], bbox[1]), min(clip[2], bbox[2]), min(clip[3], bbox[3]))
+
+
+def _layout_chars(objs):
+    for obj in objs:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            # Form XObjects (e.g. pages stamped onto other pages) nest their chars
+            yield from _layout_chars(obj)
+
+
+class PdfplumberSource:
+    name = "pdfplumber"
+
+    def __init__(self, pdf):
+        self.pdf = pdfplumber.open(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def words(self, page_no=0, clip=None):
+        page = self.pdf.pages[page_no]
+        if clip is None:
+            return page.extract_words()
+
+        # pdfminer still lays out the whole page, but only chars fully inside
+        # the clip are converted to pdfplumber dicts and grouped into words
+        x0, top, x1, bottom = clip
+        mb_x0, mb_top = page.mediabox[:2]
+        chars = [
+            page.process_object(obj)
+            for obj in _layout_chars(page.layout)
+            if x0 <= obj.x0 + mb_x0 and obj.x1 + mb_x0 <= x1
+            and top <= page.height - obj.y1 + mb_top and page.height - obj.y0 + mb_top <= bottom
+        ]
+        return pdfplumber.utils.extract_words(chars)
+
+    def close(self):
+        self.pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _line_size(lines, x, bottom):
+    """
+    Font size of the line a word (center x, bottom) belongs to. lines maps
+    rounded line bottoms to [(bbox, size)]; words in a single-size line end
+    exactly where it does, others are looked up by position.
+    """
+    for (x0, _, x1, _), size in lines.get(round(bottom, 1), ()):
+        if x0 <= x <= x1:
+            return size
+    candidates = [line for same_bottom in lines.values() for line in same_bottom]
+    for (x0, y0, x1, y1), size in candidates:
+        if x0 <= x <= x1 and y0 <= bottom <= y1:
+            return size
+    return min(candidates, key=lambda line: abs(line[0][3] - bottom))[1]
+
+
+class PymupdfSource:
+    """
+    Words from PyMuPDF's text page. The open document is kept on .doc so
+    highlight_pdf() can annotate it without opening the file again.
+
+    fitz word boxes span the font's full ascender height, while pdfplumber
+    uses top = bottom - font size. The line's font size is looked up from
+    the same text page so template tolerances behave identically.
+    """
+
+    name = "pymupdf"
+
+    def __init__(self, pdf):
+        self.doc = open_fitz(pdf)
+
+    def __len__(self):
+        return self.doc.page_count
+
+    def words(self, page_no=0, clip=None):
+        page = self.doc[page_no]
+        if clip is None:
+            textpage = page.get_textpage()
+            sizes = {}
+            for block in textpage.extractDICT()["blocks"]:
+                for line_no, line in enumerate(block.get("lines", [])):
+                    sizes[block["number"], line_no] = max(span["size"] for span in line["spans"])
+            size = lambda x0, y0, x1, y1, block_no, line_no: sizes[block_no, line_no]
+        else:
+            textpage = page.get_textpage(clip=fitz.Rect(clamp_clip(clip, page.rect)))
+            # Clipped text pages number blocks and lines differently in the dict
+            # and in the words, so words are matched to lines by position
+            lines = {}
+            for block in textpage.extractDICT()["blocks"]:
+                for line in block.get("lines", []):
+                    lines.setdefault(round(line["bbox"][3], 1), []).append(
+                        (line["bbox"], max(span["size"] for span in line["spans"]))
+                    )
+            size = lambda x0, y0, x1, y1, block_no, line_no: _line_size(lines, (x0 + x1) / 2, y1)
+
+        return [
+            {"text": text, "x0": x0, "top": y1 - size(x0, y0, x1, y1, block_no, line_no), "x1": x1, "bottom": y1}
+            for x0, y0, x1, y1, text, block_no, line_no, _ in textpage.extractWORDS()
+        ]
+
+    def close(self):
+        self.doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+BACKENDS = {
+    "pdfplumber": PdfplumberSource,
+    "pymupdf": PymupdfSource,
+}
+
+DEFAULT_BACKEND = "pdfplumber"
+
+
+def open_source(pdf, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown word backend: {backend!r} (use one of {', '.join(BACKENDS)})")
+    return BACKENDS[backend](pdf)
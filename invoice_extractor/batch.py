@@ -0,0 +1,186 @@
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from invoice_extractor.backends import NoTextLayerError
+from invoice_extractor.extraction import extract_pdf, highlight_pdf, process_invoice
+from invoice_extractor.instrumentation import Timings
+
+DEFAULT_OCR_WORKERS = 1
+# Files submitted to the pool ahead of the one being yielded, per worker
+QUEUED_PER_WORKER = 2
+
+
+def run_one(job, output_dir, template=None, backend=None, keep_boxes=False, ocr=False, ocr_cache=None):
+    """
+    Extract one job (a path or a (name, pdf_bytes) pair) into an
+    iter_batch() result dict; meant to be submitted to a process pool.
+    Never raises: one bad PDF only sets its own "error".
+    """
+    name, pdf = job if isinstance(job, tuple) else (job, job)
+    result = {"path": name, "data": None, "boxes": None, "highlight_path": None, "error": None, "scanned": False}
+    timings = Timings(os.path.basename(name))
+    try:
+        if keep_boxes:
+            result["data"], result["boxes"] = extract_pdf(pdf, template, backend, timings, ocr, ocr_cache)
+        else:
+            result["data"], result["highlight_path"] = process_invoice(
+                pdf, output_dir, template, backend, name=os.path.basename(name), timings=timings, ocr=ocr,
+                ocr_cache=ocr_cache,
+            )
+    except NoTextLayerError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["scanned"] = not ocr
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["timings"] = timings.as_dict()
+    return result
+
+
+def timed_highlight(pdf, boxes):
+    """highlight_pdf() to bytes for a worker process. Returns (highlighted_bytes, seconds)."""
+    start = time.perf_counter()
+    highlighted = highlight_pdf(pdf, boxes)
+    return highlighted, time.perf_counter() - start
+
+
+def _crashed(job, e):
+    # The worker process itself died (e.g. BrokenProcessPool)
+    return {
+        "path": job[0] if isinstance(job, tuple) else job,
+        "data": None, "boxes": None, "highlight_path": None,
+        "error": f"{type(e).__name__}: {e}", "scanned": False, "timings": None,
+    }
+
+
+def collect_result(future, job):
+    """run_one()'s result from a pool future, or an error result if the worker process died."""
+    try:
+        return future.result()
+    except Exception as e:
+        return _crashed(job, e)
+
+
+def ignore_sigint():
+    """Pool initializer for long-running callers that handle Ctrl+C themselves and shut the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def iter_batch(pdf_paths, output_dir, max_workers=None, template=None, backend=None, keep_boxes=False,
+               ocr=False, ocr_workers=DEFAULT_OCR_WORKERS, ocr_cache=None):
+    """
+    Extract (and highlight, when output_dir is set) every PDF across a
+    process pool, yielding one result dict per input in input order:
+    {"path", "data", "boxes", "highlight_path", "error", "scanned",
+    "timings"}, where "timings" is an instrumentation.Timings.as_dict()
+    record and "scanned" marks files that failed for lack of a text layer.
+
+    Each input is a file path or a (name, pdf_bytes) pair for in-memory
+    uploads. With keep_boxes=True nothing is highlighted; the matched word
+    boxes come back in "boxes" (a compact box_array) so the caller can
+    highlight later with highlight_pdf().
+
+    template is a template file path (compiled once per worker), a tuple of
+    paths to route between, or None for the default invoice_v1 template;
+    backend picks the word source.
+
+    Results are yielded as soon as every earlier file is done, so callers
+    can stream them to disk while later files are still running. At most
+    QUEUED_PER_WORKER x max_workers files are in the pool at a time and a
+    result is dropped once yielded, so memory stays flat however long the
+    batch is. A file that fails (corrupt PDF, crashed worker) only sets
+    its own "error".
+
+    With ocr=True (needs pytesseract), scanned files are retried with OCR
+    in a separate pool of ocr_workers processes as soon as their text pass
+    comes back empty, so slow OCR never holds up the main pool's workers.
+    OCR'd pages are cached in the SQLite file ocr_cache, if given.
+    """
+    jobs = list(pdf_paths)
+    if not jobs:
+        return
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+
+    if max_workers == 1:
+        # Not worth forking a pool for a single worker
+        for job in jobs:
+            result = run_one(job, output_dir, template, backend, keep_boxes)
+            if ocr and result["scanned"]:
+                result = run_one(job, output_dir, template, backend, keep_boxes, True, ocr_cache)
+            yield result
+        return
+
+    if ocr:
+        yield from _iter_with_ocr(jobs, output_dir, max_workers, template, backend, keep_boxes, ocr_workers, ocr_cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        window = deque()
+
+        def submit(job):
+            window.append((job, pool.submit(run_one, job, output_dir, template, backend, keep_boxes)))
+
+        remaining = iter(jobs)
+        for job in islice(remaining, QUEUED_PER_WORKER * max_workers):
+            submit(job)
+        while window:
+            job, future = window.popleft()
+            yield collect_result(future, job)
+            for job in islice(remaining, 1):
+                submit(job)
+
+
+def _iter_with_ocr(jobs, output_dir, max_workers, template, backend, keep_boxes, ocr_workers, ocr_cache):
+    with ProcessPoolExecutor(max_workers=max_workers) as pool, ProcessPoolExecutor(max_workers=ocr_workers) as ocr_pool:
+        window = deque()  # [job, future]; the future is replaced by the OCR retry for scans
+        waiting = {}      # text-pass future -> its window entry
+
+        def submit(job):
+            future = pool.submit(run_one, job, output_dir, template, backend, keep_boxes)
+            entry = [job, future]
+            waiting[future] = entry
+            window.append(entry)
+
+        def hand_off(done):
+            # Scans go to the OCR pool the moment their text pass finishes
+            for future in done:
+                entry = waiting.pop(future, None)
+                if entry is not None and collect_result(future, entry[0])["scanned"]:
+                    entry[1] = ocr_pool.submit(
+                        run_one, entry[0], output_dir, template, backend, keep_boxes, True, ocr_cache
+                    )
+
+        remaining = iter(jobs)
+        for job in islice(remaining, QUEUED_PER_WORKER * max_workers):
+            submit(job)
+        while window:
+            entry = window[0]
+            while entry[1] in waiting or not entry[1].done():
+                done, _ = wait(list(waiting) + [entry[1]], return_when=FIRST_COMPLETED)
+                hand_off(done)
+            window.popleft()
+            yield collect_result(entry[1], entry[0])
+            for job in islice(remaining, 1):
+                submit(job)
+
+
+def run_batch(pdf_paths, output_dir, max_workers=None, on_progress=None, template=None, backend=None, ocr=False,
+              ocr_cache=None):
+    """
+    Collect iter_batch() into a list in input order.
+
+    on_progress(done, total, result) is called from the calling thread after
+    each result, so it is safe to update Streamlit from it.
+    """
+    pdf_paths = list(pdf_paths)
+    results = []
+    batch = iter_batch(pdf_paths, output_dir, max_workers=max_workers, template=template, backend=backend, ocr=ocr,
+                       ocr_cache=ocr_cache)
+    for result in batch:
+        results.append(result)
+        if on_progress:
+            on_progress(len(results), len(pdf_paths), result)
+    return results
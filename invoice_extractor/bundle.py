@@ -0,0 +1,115 @@
+import fitz  # PyMuPDF
+import os
+import shutil
+import zipfile
+
+from invoice_extractor.backends import open_fitz
+
+CHUNK_SIZE = 1024 * 1024
+MERGE_CHUNK = 50
+
+
+# --------------------------------------------------
+# Highlighted-PDF Bundles
+# --------------------------------------------------
+# A bundle takes one highlighted PDF at a time (path or bytes) and writes
+# it to disk straight away, so exporting thousands of invoices never holds
+# more than one file (or one merge chunk) in memory.
+
+class ZipBundle:
+    """One ZIP member per PDF, copied in CHUNK_SIZE pieces. PDFs are already compressed, so members are stored."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def add(self, name, pdf):
+        with self._zip.open(name, "w", force_zip64=True) as dest:
+            if isinstance(pdf, bytes):
+                dest.write(pdf)
+            else:
+                with open(pdf, "rb") as src:
+                    shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        self.count += 1
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MergedPdfBundle:
+    """
+    All PDFs in one document via fitz insert_pdf, with a bookmark per
+    invoice. Every `chunk` files the document is saved (incrementally
+    after the first time) and reopened from disk, so fitz only keeps the
+    current chunk's pages in memory.
+    """
+
+    def __init__(self, path, chunk=MERGE_CHUNK):
+        self.path = path
+        self.chunk = chunk
+        self.count = 0
+        self._doc = fitz.open()
+        self._saved = False
+        self._toc = []
+
+    def add(self, name, pdf):
+        src = open_fitz(pdf)
+        self._toc.append([1, name, self._doc.page_count + 1])
+        self._doc.insert_pdf(src)
+        src.close()
+        self.count += 1
+        if self.count % self.chunk == 0:
+            self._flush()
+
+    def _flush(self):
+        if self._saved:
+            self._doc.saveIncr()
+        else:
+            self._doc.save(self.path)
+            self._saved = True
+        self._doc.close()
+        self._doc = open_fitz(self.path)
+
+    def close(self):
+        if self._doc is None:
+            return
+        if not self.count:
+            # fitz cannot save a document without pages
+            self._doc.close()
+            self._doc = None
+            return
+        self._doc.set_toc(self._toc)
+        if self._saved:
+            self._doc.saveIncr()
+        else:
+            self._doc.save(self.path)
+        self._doc.close()
+        self._doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+BUNDLES = {
+    "zip": ZipBundle,
+    "pdf": MergedPdfBundle,
+}
+
+
+def open_bundle(path, fmt=None):
+    """Open a highlighted-PDF bundle, picking ZIP or merged PDF from the file extension if fmt is not given."""
+    if fmt is None:
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in BUNDLES:
+        raise ValueError(f"Unsupported bundle format: {fmt!r} (use one of {', '.join(BUNDLES)})")
+    return BUNDLES[fmt](path)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join("output", "extraction_cache.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(pdf_bytes, template):
+    """Key = content hash of the PDF + the template it was extracted with."""
+    return f"{hashlib.sha256(pdf_bytes).hexdigest()}:{template.key}:{template.digest}"
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache of {extracted fields, highlighted PDF bytes}
+    keyed by cache_key(). Entries are evicted least-recently-used first once
+    the stored payloads exceed max_bytes. One instance can be shared between
+    threads (e.g. every session of the Streamlit app).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " highlighted BLOB,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+
+    def get(self, key):
+        """Return (extracted, highlighted_bytes) or None on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT data, highlighted FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, extracted, highlighted=None):
+        data = json.dumps(extracted, ensure_ascii=False)
+        size = len(data) + len(highlighted or b"")
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, data, highlighted, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, highlighted, size, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,90 @@
+import numpy as np
+
+from invoice_extractor.word_index import WordIndex
+
+# How far (points) an anchor word may have moved from its template position
+CALIBRATION_SEARCH = 40
+# Fits that move no anchor by more than this are treated as identity
+MIN_SHIFT = 1.0
+# Fits that scale either axis by more than this are assumed to be bad anchor matches
+MAX_SCALE_DRIFT = 0.2
+
+
+# --------------------------------------------------
+# Anchor-based Calibration
+# --------------------------------------------------
+# A template's "anchors" are label words at known (x0, top) positions.
+# Finding them on a page gives point pairs template -> page, and an affine
+# fit over those pairs absorbs scanner/printer offset and scale drift.
+
+def find_anchors(index, anchors, search=CALIBRATION_SEARCH):
+    """
+    Match anchors to a page's WordIndex (or word list) by text, taking the
+    nearest occurrence within `search` points. Only the words in each
+    anchor's vertical band are looked at. Returns (template_points,
+    page_points) as (n, 2) arrays for the anchors that were found.
+    """
+    index = index if isinstance(index, WordIndex) else WordIndex(index)
+    template_points, page_points = [], []
+    for anchor in anchors:
+        near = index.find_text(anchor["text"], anchor["x"], anchor["y"], search)
+        if not len(near):
+            continue
+        distance = np.hypot(index.x0[near] - anchor["x"], index.top[near] - anchor["y"])
+        best = int(np.argmin(distance))
+        if distance[best] <= search:
+            template_points.append((anchor["x"], anchor["y"]))
+            page_points.append((index.x0[near[best]], index.top[near[best]]))
+    return np.asarray(template_points, dtype=float).reshape(-1, 2), np.asarray(page_points, dtype=float).reshape(-1, 2)
+
+
+def fit_affine(template_points, page_points):
+    """
+    Least-squares 2x3 affine matrix mapping template points onto page
+    points. Three or more non-collinear pairs give a full affine fit; fewer
+    fall back to the mean translation. None without any pairs.
+    """
+    n = len(template_points)
+    if n == 0:
+        return None
+    if n >= 3:
+        design = np.hstack([template_points, np.ones((n, 1))])
+        solution, _, rank, _ = np.linalg.lstsq(design, page_points, rcond=None)
+        if rank == 3:
+            return solution.T
+    shift = (page_points - template_points).mean(axis=0)
+    return np.array([[1.0, 0.0, shift[0]], [0.0, 1.0, shift[1]]])
+
+
+def plausible(matrix, template_points):
+    """False for identity-like fits (nothing to correct) and implausibly large scale changes."""
+    moved = template_points @ matrix[:, :2].T + matrix[:, 2] - template_points
+    if np.abs(moved).max() < MIN_SHIFT:
+        return False
+    scale = np.linalg.norm(matrix[:, :2], axis=0)
+    return bool(np.all(np.abs(scale - 1) <= MAX_SCALE_DRIFT))
+
+
+def calibrate(index, anchors):
+    """Template -> page affine matrix for one page's WordIndex, or None if the page needs no correction."""
+    if not anchors:
+        return None
+    template_points, page_points = find_anchors(index, anchors)
+    matrix = fit_affine(template_points, page_points)
+    if matrix is None or not plausible(matrix, template_points):
+        return None
+    return matrix
+
+
+def to_template_space(matrix, x0, top, bottom):
+    """
+    Map word coordinate arrays from page space back into template space,
+    so every field region can be matched unchanged.
+    """
+    inverse = np.linalg.inv(matrix[:, :2])
+    offset = matrix[:, 2]
+    dx = x0 - offset[0]
+    x0_t = inverse[0, 0] * dx + inverse[0, 1] * (top - offset[1])
+    top_t = inverse[1, 0] * dx + inverse[1, 1] * (top - offset[1])
+    bottom_t = inverse[1, 0] * dx + inverse[1, 1] * (bottom - offset[1])
+    return x0_t, top_t, bottom_t
@@ -0,0 +1,217 @@
+import argparse
+import glob
+import os
+import sys
+
+from invoice_extractor.backends import BACKENDS
+from invoice_extractor.batch import DEFAULT_OCR_WORKERS, iter_batch
+from invoice_extractor.bundle import BUNDLES, open_bundle
+from invoice_extractor.instrumentation import metrics_to_json, metrics_to_prometheus
+from invoice_extractor.ocr import ocr_available
+from invoice_extractor.template import load_template, row_columns
+from invoice_extractor.writers import WRITERS, ExcelWriter, ParquetWriter, open_writer, split_line_items
+
+TYPED_CHUNK = 1000
+OCR_CACHE = "ocr_cache.sqlite"
+
+
+def collect_pdfs(inputs):
+    """Expand directories (all *.pdf inside) and glob patterns into a sorted, de-duplicated path list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF"))
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+# --------------------------------------------------
+# Options shared with the watcher and the service
+# --------------------------------------------------
+
+def add_extraction_arguments(parser, ocr_cache_default):
+    """Add the -t/--template, -b/--backend, --ocr, --ocr-cache and -j/--workers options."""
+    parser.add_argument("-t", "--template", action="append",
+                        help="JSON/YAML template file (default: built-in invoice_v1); repeat to auto-route each PDF to the best match")
+    parser.add_argument("-b", "--backend", choices=sorted(BACKENDS), help="Word source (default: pdfplumber; pymupdf is faster)")
+    parser.add_argument("--ocr", action="store_true", help="OCR scanned PDFs without a text layer (needs pytesseract and tesseract)")
+    parser.add_argument("--ocr-cache", help=f"SQLite file caching OCR'd pages (default: {ocr_cache_default})")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+
+
+def template_from_args(args):
+    """None for the built-in template, the one -t path, or a tuple of paths to route between."""
+    if not args.template:
+        return None
+    return args.template[0] if len(args.template) == 1 else tuple(args.template)
+
+
+def check_ocr(args):
+    """False, after saying why on stderr, if --ocr was given but Tesseract is not installed."""
+    if args.ocr and not ocr_available():
+        print("--ocr needs pytesseract and the tesseract binary (pip install pytesseract pillow).", file=sys.stderr)
+        return False
+    return True
+
+
+# --------------------------------------------------
+# Batch CLI
+# --------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m invoice_extractor",
+        description="Batch coordinate-based invoice extraction without the Streamlit UI.",
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns (quote globs, e.g. 'inbox/**/*.pdf')")
+    parser.add_argument("-o", "--output", required=True, help="Results file (.csv, .jsonl, .parquet or .xlsx)")
+    parser.add_argument("-f", "--format", choices=sorted(WRITERS), help="Output format (default: from --output extension)")
+    parser.add_argument("--line-items", help="Line-item rows from template tables (default: a \"Line Items\" sheet for .xlsx, "
+                                             "else <output>_line_items.<ext>)")
+    parser.add_argument("--highlight-dir", help="Also write highlighted_<name>.pdf copies into this folder")
+    parser.add_argument("--bundle", help="Also collect the highlighted PDFs into one .zip or merged .pdf (needs --highlight-dir)")
+    add_extraction_arguments(parser, f"{OCR_CACHE} next to --output")
+    parser.add_argument("--ocr-workers", type=int, default=DEFAULT_OCR_WORKERS,
+                        help=f"Processes reserved for OCR (default: {DEFAULT_OCR_WORKERS})")
+    parser.add_argument("--typed", action="store_true",
+                        help="Parse fields by their template \"kind\" (money, date, ...) and add Valid/Validation columns")
+    parser.add_argument("--metrics", help="Write per-invoice stage timings here (.json, or .prom for Prometheus text)")
+    return parser
+
+
+class _SheetWriter:
+    def __init__(self, writer, sheet):
+        self._writer = writer
+        self._sheet = sheet
+
+    def write(self, row):
+        self._writer.write(row, sheet=self._sheet)
+
+    def close(self):
+        pass  # the workbook is saved by the main writer
+
+
+def open_items_writer(args, writer):
+    if args.line_items:
+        return open_writer(args.line_items)
+    if isinstance(writer, ExcelWriter):
+        return _SheetWriter(writer, "Line Items")
+    stem, ext = os.path.splitext(args.output)
+    return open_writer(f"{stem}_line_items{ext}", args.format)
+
+
+class TypedRows:
+    """Buffers rows and writes them normalized (typed + validated) TYPED_CHUNK rows at a time."""
+
+    def __init__(self, writer, templates, columns=None):
+        from invoice_extractor import normalize  # pandas is only needed for --typed
+
+        self._normalize = normalize
+        self._writer = writer
+        self._columns = columns
+        self._kinds, self._checks = normalize.template_rules(templates)
+        self._rows = []
+        self.invalid = 0
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= TYPED_CHUNK:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pandas as pd
+
+        # Every chunk gets every column, so typed columns keep one type across chunks
+        frame = pd.DataFrame(self._rows, columns=self._columns)
+        frame = self._normalize.normalize_frame(frame, self._kinds, self._checks)
+        self._rows = []
+        self.invalid += int((~frame["Valid"]).sum())
+        if isinstance(self._writer, ParquetWriter):
+            self._writer.write_frame(frame)
+        else:
+            for row in self._normalize.frame_records(frame):
+                self._writer.write(row)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    pdf_paths = collect_pdfs(args.inputs)
+    if not pdf_paths:
+        print("No PDF files matched.", file=sys.stderr)
+        return 2
+
+    if args.highlight_dir:
+        os.makedirs(args.highlight_dir, exist_ok=True)
+
+    if args.bundle:
+        if not args.highlight_dir:
+            print("--bundle needs --highlight-dir.", file=sys.stderr)
+            return 2
+        if os.path.splitext(args.bundle)[1].lstrip(".").lower() not in BUNDLES:
+            print(f"--bundle must end in {' or '.join('.' + ext for ext in BUNDLES)}.", file=sys.stderr)
+            return 2
+
+    if not check_ocr(args):
+        return 2
+
+    # One template is used as-is; several are routed between per PDF
+    template = template_from_args(args)
+
+    # Fixed up front: with several templates the first row lacks the others' fields
+    templates = [load_template(path) for path in (args.template or [None])]
+    columns = row_columns(templates)
+
+    failed = 0
+    records = []
+    items_writer = None
+    bundle = open_bundle(args.bundle) if args.bundle else None
+    with open_writer(args.output, args.format, columns + (["Valid", "Validation"] if args.typed else [])) as writer:
+        rows = writer
+        if args.typed:
+            rows = TypedRows(writer, templates, columns)
+        batch = iter_batch(pdf_paths, args.highlight_dir, max_workers=args.workers, template=template, backend=args.backend,
+                           ocr=args.ocr, ocr_workers=args.ocr_workers,
+                           ocr_cache=args.ocr_cache or os.path.join(os.path.dirname(os.path.abspath(args.output)), OCR_CACHE))
+        for result in batch:
+            if result["timings"]:
+                records.append(result["timings"])
+            if result["error"]:
+                failed += 1
+                print(f"FAILED {result['path']}: {result['error']}", file=sys.stderr)
+                continue
+            source_file = os.path.basename(result["path"])
+            data, items = split_line_items(result["data"], source_file)
+            row = {"Source File": source_file}
+            row.update(data)
+            rows.write(row)
+            if bundle is not None:
+                bundle.add(os.path.basename(result["highlight_path"]), result["highlight_path"])
+
+            # Only opened once some template actually produced line items
+            for item in items:
+                if items_writer is None:
+                    items_writer = open_items_writer(args, writer)
+                items_writer.write(item)
+
+        if args.typed:
+            rows.flush()
+            if rows.invalid:
+                print(f"{rows.invalid} invoices failed validation (see the Validation column)", file=sys.stderr)
+
+    if items_writer is not None:
+        items_writer.close()
+    if bundle is not None:
+        bundle.close()
+
+    if args.metrics:
+        export = metrics_to_prometheus if args.metrics.endswith(".prom") else metrics_to_json
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(export(records))
+
+    print(f"Processed {len(pdf_paths) - failed}/{len(pdf_paths)} invoices -> {args.output}", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,208 @@
+import fitz  # PyMuPDF
+import os
+
+import numpy as np
+
+from invoice_extractor.backends import NoTextLayerError, open_fitz, open_source
+from invoice_extractor.instrumentation import stage
+from invoice_extractor.routing import load_router
+from invoice_extractor.template import load_template
+from invoice_extractor.word_index import PageIndexes, box_array
+
+# --------------------------------------------------
+# Helper Functions
+# --------------------------------------------------
+
+# Both return (text, boxes) with boxes a box_array() of the matched words
+
+def extract_line(index, x_start, x_end, y_center, tolerance=6):
+    lo, hi = index.band_range(y_center - tolerance, y_center + tolerance)
+    x0 = index.x0[lo:hi]
+    hits = lo + np.flatnonzero((x0 >= x_start) & (x0 <= x_end))
+    hits = hits[np.argsort(index.x0[hits], kind="stable")]
+    return index.join(hits), index.boxes(hits)
+
+
+def extract_block(index, x_start, x_end, y_start, y_end):
+    # Index order is already (top, x0) reading order
+    lo, hi = index.band_range(y_start, y_end)
+    x0 = index.x0[lo:hi]
+    hits = lo + np.flatnonzero((x0 >= x_start) & (x0 <= x_end) & (index.bottom[lo:hi] <= y_end))
+    return index.join(hits), index.boxes(hits)
+
+
+MERGE_GAP = 4         # words closer than this (pt) on one line share a highlight
+LINE_TOLERANCE = 2    # tops within this (pt) are on the same line
+THUMBNAIL_DPI = 50
+
+
+def merge_boxes(boxes, gap=MERGE_GAP):
+    """
+    Group word boxes (a box_array() or a list of words) into highlight
+    regions, one field (box group) at a time. A field's words on one line
+    less than `gap` apart become one rect, and rects on consecutive lines
+    that overlap horizontally and are less than half a line apart (a block
+    field's lines) become one region. Returns [(page_no, [fitz.Rect, ...])].
+    """
+    by_group = {}
+    seen = set()
+    for page_no, x0, top, x1, bottom, group in box_array(boxes).tolist():
+        # The same word may be matched by several fields; it is highlighted with the first
+        if (page_no, top, x0, x1, bottom) in seen:
+            continue
+        seen.add((page_no, top, x0, x1, bottom))
+        by_group.setdefault((int(page_no), int(group)), []).append((top, x0, x1, bottom))
+
+    regions = []
+    for (page_no, _), words in sorted(by_group.items()):
+        lines = []
+        for word in sorted(words):
+            if not lines or word[0] - lines[-1][0][0] > LINE_TOLERANCE:
+                lines.append([])
+            lines[-1].append(word)
+
+        runs = []
+        for line in lines:
+            run = None
+            for top, x0, x1, bottom in sorted(line, key=lambda w: w[1]):
+                if run is not None and x0 - run.x1 <= gap:
+                    run = run | fitz.Rect(x0, top, x1, bottom)
+                    runs[-1] = run
+                else:
+                    run = fitz.Rect(x0, top, x1, bottom)
+                    runs.append(run)
+
+        field_regions = []
+        for run in sorted(runs, key=lambda r: (r.y0, r.x0)):
+            for rects in reversed(field_regions):
+                last = rects[-1]
+                if 0 <= run.y0 - last.y1 < last.height / 2 and run.x0 < last.x1 and run.x1 > last.x0:
+                    rects.append(run)
+                    break
+            else:
+                field_regions.append([run])
+        regions.extend((page_no, rects) for rects in field_regions)
+    return regions
+
+
+def highlight_pdf(input_path, boxes, output_path=None):
+    """
+    input_path may be a path, PDF bytes or an already-open fitz document
+    (annotated in place). Adjacent word boxes of one field are merged
+    (merge_boxes), so each field (or table cell) gets one highlight
+    annotation per region rather than one per word. Without output_path the
+    highlighted PDF is returned as bytes instead of being saved.
+    """
+    doc = input_path if isinstance(input_path, fitz.Document) else open_fitz(input_path)
+    for page_no, rects in merge_boxes(boxes):
+        doc[page_no].add_highlight_annot(quads=rects)
+    highlighted = None
+    if output_path is None:
+        highlighted = doc.tobytes()
+    else:
+        doc.save(output_path)
+    if doc is not input_path:
+        doc.close()
+    return highlighted
+
+
+def render_thumbnail(pdf, page_no=0, dpi=THUMBNAIL_DPI):
+    """PNG bytes of one page (e.g. of a highlighted PDF) at low resolution, for review grids."""
+    doc = pdf if isinstance(pdf, fitz.Document) else open_fitz(pdf)
+    png = doc[page_no].get_pixmap(dpi=dpi).tobytes("png")
+    if doc is not pdf:
+        doc.close()
+    return png
+
+
+# --------------------------------------------------
+# Invoice Template
+# --------------------------------------------------
+
+def resolve_template(template=None):
+    """
+    A CompiledTemplate or TemplateRouter from a template, a template file
+    path (default: invoice_v1) or a tuple of paths to route between.
+    """
+    if template is None or isinstance(template, str):
+        return load_template(template)
+    if isinstance(template, (tuple, list)):
+        return load_router(tuple(template))
+    return template
+
+
+def extract_invoice(pages, template=None, timings=None):
+    """
+    Run every field of a template against a PageIndexes (or one WordIndex).
+    template is anything resolve_template() accepts.
+    """
+    return resolve_template(template).extract(pages, timings)
+
+
+# --------------------------------------------------
+# Per-file Pipeline
+# --------------------------------------------------
+
+def open_pdf(pdf, backend=None, ocr=False, timings=None, ocr_cache=None):
+    """
+    Word source for one PDF; with ocr=True pages without a text layer are
+    OCR'd, and cached in the SQLite file ocr_cache if given.
+    """
+    if ocr:
+        from invoice_extractor.ocr import OcrSource
+        return OcrSource(pdf, backend, cache_path=ocr_cache, timings=timings)
+    return open_source(pdf, backend)
+
+
+def index_pages(source, timings=None, template=None):
+    """
+    PageIndexes for a source, refusing documents where none of the pages
+    the template reads has words (page 1 for routers, which classify it).
+    With a CompiledTemplate only the area around its regions is parsed on
+    each page (routers need whole pages to classify them).
+    """
+    pages = PageIndexes(source, timings, getattr(template, "page_clip", None))
+    pages_read = template.pages_read(len(pages)) if hasattr(template, "pages_read") else [0]
+    pages_read = [page_no for page_no in pages_read if page_no < len(pages)]
+    if pages_read and not any(len(pages[page_no]) for page_no in pages_read):
+        where = "page 1" if pages_read == [0] else "the pages this template reads"
+        if source.name == "ocr":
+            raise NoTextLayerError(f"No text found on {where}, even with OCR")
+        raise NoTextLayerError(f"No text layer on {where} (scanned PDF?); enable OCR to read it")
+    return pages
+
+
+def extract_pdf(pdf, template=None, backend=None, timings=None, ocr=False, ocr_cache=None):
+    """Extract one PDF (path or bytes) without highlighting. Returns (extracted, highlight_boxes)."""
+    with stage(timings, "open"):
+        source = open_pdf(pdf, backend, ocr, timings, ocr_cache)
+    template = resolve_template(template)
+    with source:
+        return extract_invoice(index_pages(source, timings, template), template, timings)
+
+
+def process_invoice(pdf, output_dir=None, template=None, backend=None, name=None, timings=None, ocr=False,
+                    ocr_cache=None):
+    """
+    Extract one invoice (path or bytes) and, if output_dir is given, write
+    its highlighted copy there as highlighted_<name>. Returns
+    (extracted, highlight_path or None).
+    backend picks the word source ("pdfplumber" or "pymupdf"); timings
+    (an instrumentation.Timings) records open/words/fields/highlight.
+    Raises NoTextLayerError for scans unless ocr=True (needs pytesseract);
+    ocr_cache is the SQLite file OCR'd pages are cached in (None: no cache).
+    """
+    with stage(timings, "open"):
+        source = open_pdf(pdf, backend, ocr, timings, ocr_cache)
+    template = resolve_template(template)
+    with source:
+        extracted, highlight_boxes = extract_invoice(index_pages(source, timings, template), template, timings)
+
+        highlight_path = None
+        if output_dir is not None:
+            name = name or os.path.basename(pdf)
+            highlight_path = os.path.join(output_dir, f"highlighted_{name}")
+            with stage(timings, "highlight"):
+                # The PyMuPDF and OCR sources already have the document open
+                highlight_pdf(getattr(source, "doc", pdf), highlight_boxes, highlight_path)
+    return extracted, highlight_path
@@ -0,0 +1,130 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+# --------------------------------------------------
+# Per-invoice Timings
+# --------------------------------------------------
+
+class Timings:
+    """
+    Stage timings and per-field match counts for one invoice.
+
+    Stages nest: time spent in an inner stage (e.g. lazy "words" extraction
+    triggered from inside "fields") is only counted for the inner stage, so
+    the stage totals add up to the wall time.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.stages = {}
+        self.matches = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = self._stack.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - inner
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def as_dict(self):
+        return {"file": self.name, "stages": dict(self.stages), "matches": dict(self.matches)}
+
+
+@contextmanager
+def stage(timings, name):
+    """timings.stage(name), or nothing at all when timings is None."""
+    if timings is None:
+        yield
+    else:
+        with timings.stage(name):
+            yield
+
+
+# --------------------------------------------------
+# Batch Export
+# --------------------------------------------------
+# Exporters take a list of Timings.as_dict() records.
+
+def metrics_to_json(records):
+    return json.dumps(records, indent=2)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def metrics_to_prometheus(records):
+    """Prometheus text exposition: stage seconds/count and per-field match totals."""
+    stage_seconds = {}
+    stage_count = {}
+    field_matches = {}
+    field_empty = {}
+    for record in records:
+        for name, seconds in record["stages"].items():
+            stage_seconds[name] = stage_seconds.get(name, 0.0) + seconds
+            stage_count[name] = stage_count.get(name, 0) + 1
+        for field, count in record["matches"].items():
+            field_matches[field] = field_matches.get(field, 0) + count
+            field_empty[field] = field_empty.get(field, 0) + (count == 0)
+
+    lines = [
+        "# HELP invoice_stage_seconds Time spent per extraction stage.",
+        "# TYPE invoice_stage_seconds summary",
+    ]
+    for name in stage_seconds:
+        lines.append(f'invoice_stage_seconds_sum{{stage="{_label(name)}"}} {stage_seconds[name]:.6f}')
+        lines.append(f'invoice_stage_seconds_count{{stage="{_label(name)}"}} {stage_count[name]}')
+    lines += [
+        "# HELP invoice_field_matches_total Words matched per template field.",
+        "# TYPE invoice_field_matches_total counter",
+    ]
+    for field, count in field_matches.items():
+        lines.append(f'invoice_field_matches_total{{field="{_label(field)}"}} {count}')
+    lines += [
+        "# HELP invoice_field_empty_total Invoices where a template field matched nothing.",
+        "# TYPE invoice_field_empty_total counter",
+    ]
+    for field, count in field_empty.items():
+        lines.append(f'invoice_field_empty_total{{field="{_label(field)}"}} {count}')
+    lines.append(f"invoice_processed_total {len(records)}")
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------
+# Single-file Profiling
+# --------------------------------------------------
+
+def profile_call(func, *args, engine="cprofile", limit=30, **kwargs):
+    """
+    Run func(*args, **kwargs) under a profiler and return (result, report text).
+    engine is "cprofile" (stdlib) or "pyinstrument" (optional dependency).
+    """
+    if engine == "pyinstrument":
+        from pyinstrument import Profiler  # optional dependency
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.stop()
+        return result, profiler.output_text(unicode=True)
+
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+    return result, report.getvalue()
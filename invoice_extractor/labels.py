@@ -0,0 +1,54 @@
+import numpy as np
+
+from invoice_extractor.anchors import AnchorIndex
+
+# --------------------------------------------------
+# Label-based Extraction (App.py)
+# --------------------------------------------------
+# extract_labelled_invoice() looks every label up in one AnchorIndex per
+# page instead of scanning all words per label.
+
+# Field -> label searched for on the page
+RIGHT_OF_LABEL_FIELDS = {
+    "Invoice Number": "Invoice #",
+    "Invoice Date": "Invoice Date",
+    "Bill To Name": "Name",
+    "Email": "Email",
+    "Phone": "Phone Number",
+}
+
+
+def extract_labelled_invoice(words):
+    """
+    Label-search template used by App.py. Returns (extracted, highlight_boxes)
+    with the boxes as one box_array(), grouped by field.
+
+    Labels are looked up in an AnchorIndex built once for the page. When a
+    label occurs twice on one line (Bill To / Ship To columns), the value
+    stops where the second occurrence starts.
+    """
+    anchors = AnchorIndex(words)
+    extracted = {}
+    highlight_boxes = []
+
+    for field, label_text in RIGHT_OF_LABEL_FIELDS.items():
+        hits = anchors.find(label_text)
+        if hits:
+            x_end = anchors.same_line_after(hits[0], label_text)
+            value, positions = anchors.right_of(hits[0], x_end=x_end)
+            extracted[field] = value
+            highlight_boxes.append(anchors.index.boxes(positions, len(highlight_boxes)))
+
+    # Total Amount
+    hits = anchors.find("Total Amount")
+    if hits:
+        value, positions = anchors.right_of(hits[0])
+        extracted["Total Amount"] = value
+        highlight_boxes.append(anchors.index.boxes(positions, len(highlight_boxes)))
+
+    # Invoice Location (starting x=268, y=65, extend to right dynamically)
+    value, positions = anchors.from_x(268, 65, height=20)
+    extracted["Invoice Location"] = value
+    highlight_boxes.append(anchors.index.boxes(positions, len(highlight_boxes)))
+
+    return extracted, np.concatenate(highlight_boxes)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}"
+MONEY_TOLERANCE = 0.01
+
+
+# --------------------------------------------------
+# Column Parsers
+# --------------------------------------------------
+# Each parser takes a whole column of raw extracted text (a pandas Series
+# of str) and returns the typed column, with <NA>/NaN/NaT where the text
+# could not be parsed. Everything is done with vectorized .str / to_*
+# calls, so a batch is parsed column by column, not cell by cell.
+
+def parse_money(raw):
+    """'$1,234.50' -> 1234.5; '(12.00)' -> -12.0."""
+    text = raw.str.strip()
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    number = pd.to_numeric(text.str.replace(r"[^\d.\-]", "", regex=True), errors="coerce").astype("float64")
+    return number.where(~negative, -number.abs())
+
+
+def parse_weight(raw):
+    """First number in the text, e.g. '8 kg' -> 8.0."""
+    number = raw.str.replace(",", "", regex=False).str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(number, errors="coerce").astype("float64")
+
+
+def parse_date(raw):
+    return pd.to_datetime(raw.str.strip(), errors="coerce", format="mixed")
+
+
+def parse_email(raw):
+    email = raw.str.strip().str.lower().astype("string")
+    return email.where(email.str.fullmatch(EMAIL_PATTERN).fillna(False).astype(bool))
+
+
+def parse_phone(raw):
+    """Digits with an optional leading '+', e.g. '+88 (22) 341-2175' -> '+88223412175'."""
+    phone = raw.str.strip().str.replace(r"(?!^\+)[^\d]", "", regex=True).astype("string")
+    digits = phone.str.lstrip("+").str.len()
+    return phone.where((digits >= 7) & (digits <= 15))
+
+
+PARSERS = {
+    "money": parse_money,
+    "weight": parse_weight,
+    "date": parse_date,
+    "email": parse_email,
+    "phone": parse_phone,
+}
+
+
+# --------------------------------------------------
+# Batch Normalization
+# --------------------------------------------------
+
+def normalize_frame(frame, kinds, checks=()):
+    """
+    Typed copy of a batch of extracted rows. kinds maps field -> one of
+    PARSERS (other fields stay text). checks are template "checks", e.g.
+    {"name": "totals", "sum": ["Subtotal", "Tax ($)", "Shipping ($)"],
+    "equals": "Total Amount"}: the row fails if the money fields don't add
+    up (within "tol", default 0.01).
+
+    Adds "Valid" (bool) and "Validation" (semicolon-separated problems:
+    failed checks and non-empty fields that could not be parsed).
+    """
+    typed = frame.copy()
+    problems = pd.Series("", index=frame.index)
+
+    def flag(mask, message):
+        nonlocal problems
+        problems = problems.where(~mask, problems + np.where(problems == "", "", "; ") + message)
+
+    for name, kind in kinds.items():
+        if name not in frame or kind not in PARSERS:
+            continue
+        raw = frame[name].fillna("").astype(str)
+        typed[name] = PARSERS[kind](raw)
+        flag((raw.str.strip() != "") & typed[name].isna(), f"{name}: not a {kind}")
+
+    for check in checks:
+        columns = check["sum"] + [check["equals"]]
+        if any(c not in typed for c in columns):
+            continue
+        total = typed[check["sum"]].sum(axis=1, min_count=len(check["sum"]))
+        expected = typed[check["equals"]]
+        ok = np.isclose(total, expected, atol=check.get("tol", MONEY_TOLERANCE), rtol=0)
+        ok &= total.notna() & expected.notna()
+        flag(~ok, f"{check['name']} check failed")
+
+    typed["Valid"] = problems == ""
+    typed["Validation"] = problems
+    return typed
+
+
+def frame_records(frame):
+    """DataFrame -> list of row dicts with None for missing values, for the row writers."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def template_rules(templates):
+    """Merged (kinds, checks) of one or more CompiledTemplates, for normalize_frame()."""
+    kinds = {}
+    checks = {}
+    for template in templates:
+        kinds.update(template.kinds)
+        for check in template.checks:
+            checks.setdefault(check["name"], check)
+    return kinds, list(checks.values())
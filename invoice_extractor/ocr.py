@@ -0,0 +1,107 @@
+import hashlib
+import shutil
+
+import fitz  # PyMuPDF
+
+from invoice_extractor.backends import open_fitz, open_source
+from invoice_extractor.cache import ResultCache
+from invoice_extractor.instrumentation import stage
+
+OCR_DPI = 300
+OCR_LANG = "eng"
+
+
+def ocr_available():
+    """True if pytesseract and the tesseract binary are both installed."""
+    try:
+        import pytesseract  # optional dependency, only needed for OCR
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def page_hash(pix, lang=OCR_LANG):
+    """Content hash of a rendered page, so identical scans are only OCR'd once."""
+    h = hashlib.sha256(pix.samples)
+    h.update(f"{pix.width}x{pix.height}:{lang}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def ocr_pixmap(pix, dpi=OCR_DPI, lang=OCR_LANG):
+    """Tesseract words of a grayscale fitz pixmap as pdfplumber-style word dicts in PDF points."""
+    import pytesseract  # optional dependency, only needed for OCR
+    from PIL import Image
+
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    scale = 72 / dpi
+    words = []
+    for text, conf, left, top, width, height in zip(
+        data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+    ):
+        text = text.strip()
+        # Layout rows (blocks, lines) come back with conf -1 and no text
+        if not text or float(conf) < 0:
+            continue
+        words.append({
+            "text": text,
+            "x0": left * scale,
+            "top": top * scale,
+            "x1": (left + width) * scale,
+            "bottom": (top + height) * scale,
+        })
+    return words
+
+
+class OcrSource:
+    """
+    Word source that falls back to Tesseract for pages without a text
+    layer. Pages with text are read by the wrapped backend as usual; empty
+    ones are rendered with fitz and OCR'd. With a cache_path, the words are
+    cached in a ResultCache there under the page's content hash. OCR time
+    is recorded as the "ocr" stage. The fitz document is kept on .doc for
+    highlight_pdf().
+    """
+
+    name = "ocr"
+
+    def __init__(self, pdf, backend=None, dpi=OCR_DPI, lang=OCR_LANG, cache_path=None, timings=None):
+        self.source = open_source(pdf, backend)
+        self.doc = getattr(self.source, "doc", None) or open_fitz(pdf)
+        self.dpi = dpi
+        self.lang = lang
+        self.timings = timings
+        self.cache = ResultCache(cache_path) if cache_path else None
+
+    def __len__(self):
+        return len(self.source)
+
+    def words(self, page_no=0, clip=None):
+        words = self.source.words(page_no, clip)
+        if words or clip is not None:
+            # An empty clip says nothing about the rest of the page; PageIndexes retries unclipped
+            return words
+
+        with stage(self.timings, "ocr"):
+            pix = self.doc[page_no].get_pixmap(dpi=self.dpi, colorspace=fitz.csGRAY)
+            key = f"ocr:{page_hash(pix, self.lang)}"
+            cached = self.cache.get(key) if self.cache else None
+            if cached is not None:
+                return cached[0]
+            words = ocr_pixmap(pix, self.dpi, self.lang)
+            if self.cache:
+                self.cache.put(key, words)
+        return words
+
+    def close(self):
+        if self.doc is not getattr(self.source, "doc", None):
+            self.doc.close()
+        self.source.close()
+        if self.cache:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+from functools import lru_cache
+
+import numpy as np
+
+from invoice_extractor.instrumentation import stage
+from invoice_extractor.template import load_template
+from invoice_extractor.word_index import WordIndex
+
+GRID_COLS, GRID_ROWS = 6, 8
+DEFAULT_PAGE_SIZE = (595, 842)
+ANCHOR_TOLERANCE = 15
+ANCHOR_WEIGHT = 0.6
+
+
+def density_grid(x, y, page_size=DEFAULT_PAGE_SIZE, weights=None):
+    """L2-normalised GRID_ROWS x GRID_COLS histogram of points, flattened."""
+    width, height = page_size
+    x = np.clip(np.asarray(x, dtype=float), 0, width - 1e-6)
+    y = np.clip(np.asarray(y, dtype=float), 0, height - 1e-6)
+    grid, _, _ = np.histogram2d(y, x, bins=(GRID_ROWS, GRID_COLS), range=((0, height), (0, width)), weights=weights)
+    grid = grid.ravel()
+    norm = np.linalg.norm(grid)
+    return grid / norm if norm else grid
+
+
+def template_grid(template, page_size=DEFAULT_PAGE_SIZE, step=4.0):
+    """Expected word density of a template: its field regions and anchors, sampled every `step` points."""
+    xs, ys = [], []
+    for f in template.definition["fields"]:
+        x_start, x_end = f["x"]
+        if f["type"] == "line":
+            y_start = y_end = f["y"]
+        else:
+            y_start, y_end = f["y"]
+        gx, gy = np.meshgrid(np.arange(x_start, x_end + step, step), np.arange(y_start, y_end + step, step))
+        xs.append(gx.ravel())
+        ys.append(gy.ravel())
+    for anchor in template.definition.get("anchors", []):
+        xs.append([anchor["x"]])
+        ys.append([anchor["y"]])
+    if not xs:
+        return np.zeros(GRID_ROWS * GRID_COLS)
+    return density_grid(np.concatenate(xs), np.concatenate(ys), page_size)
+
+
+class TemplateRouter:
+    """
+    Picks the template a page belongs to from cheap features, without a
+    trial extraction per template.
+
+    Each template's fingerprint is precomputed once: a coarse word-density
+    grid from its field regions plus its "anchors" - label words expected
+    at fixed positions, e.g. {"text": "Subtotal", "x": 345, "y": 492}. Classifying a page is one
+    matrix-vector product for the grids and a bisect per anchor.
+    """
+
+    def __init__(self, templates, min_score=0.5, page_size=DEFAULT_PAGE_SIZE):
+        self.templates = list(templates)
+        self.min_score = min_score
+        self.page_size = page_size
+        self.grids = np.vstack([template_grid(t, page_size) for t in self.templates])
+        self.anchors = [t.definition.get("anchors", []) for t in self.templates]
+
+    @property
+    def key(self):
+        return "+".join(t.key for t in self.templates)
+
+    @property
+    def digest(self):
+        return "+".join(t.digest for t in self.templates)
+
+    def page_grid(self, index):
+        if not len(index):
+            return np.zeros(GRID_ROWS * GRID_COLS)
+        return density_grid((index.x0 + index.x1) / 2, (index.top + index.bottom) / 2, self.page_size)
+
+    def scores(self, index):
+        """Score in [0, 1] per template for one page's WordIndex (or word list)."""
+        index = index if isinstance(index, WordIndex) else WordIndex(index)
+        density = self.grids @ self.page_grid(index)
+
+        scores = np.empty(len(self.templates))
+        for i, anchors in enumerate(self.anchors):
+            if not anchors:
+                scores[i] = density[i]
+                continue
+            found = sum(
+                len(index.find_text(anchor["text"], anchor["x"], anchor["y"], ANCHOR_TOLERANCE)) > 0
+                for anchor in anchors
+            )
+            scores[i] = ANCHOR_WEIGHT * found / len(anchors) + (1 - ANCHOR_WEIGHT) * density[i]
+        return scores
+
+    def route(self, index):
+        """Best-matching template for a page, or None if nothing scores above min_score."""
+        scores = self.scores(index)
+        best = int(np.argmax(scores))
+        return self.templates[best] if scores[best] >= self.min_score else None
+
+    def extract(self, pages, timings=None):
+        """Route on the first page, then extract with the chosen template (adds a "Template" column)."""
+        if isinstance(pages, WordIndex):
+            pages = [pages]
+        with stage(timings, "route"):
+            template = self.route(pages[0] if len(pages) else [])
+        if template is None:
+            raise ValueError("No template matches this document")
+        extracted, highlight_boxes = template.extract(pages, timings)
+        return {"Template": template.name, **extracted}, highlight_boxes
+
+
+@lru_cache(maxsize=None)
+def load_router(paths):
+    """Build a TemplateRouter over a tuple of template paths once per process."""
+    return TemplateRouter(load_template(path) for path in paths)
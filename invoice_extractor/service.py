@@ -0,0 +1,369 @@
+"""
+HTTP extraction service, so other systems can extract invoices without the
+Streamlit app.
+
+    python -m invoice_extractor.service --queue-dir queue/ --port 8000
+
+    POST /extract            one PDF (raw body or multipart field "file") -> fields as JSON
+    POST /jobs               PDFs as multipart fields "files" -> {"id", "status": "queued", ...}
+    GET  /jobs/{id}          job status, counts and errors keyed by input index
+    GET  /jobs/{id}/results  results.jsonl (one row per extracted PDF, with its "Index" in files) once the job is done
+    GET  /health
+
+Extraction runs in a process pool that is forked and warmed up (libraries
+imported, templates compiled) before the server accepts requests, so no
+request pays for a cold import. Batch jobs go through FileQueue, a folder
+on disk standing in for a message broker. The job runner uses at most
+--job-slots workers and the pool always has at least one more, so
+single-PDF requests always find a free one. If a worker process dies, the
+files in the pool at that moment fail and a fresh warm pool takes over.
+
+Needs starlette and uvicorn (pip install starlette uvicorn python-multipart).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+from invoice_extractor.batch import collect_result, ignore_sigint, run_one
+from invoice_extractor.cli import add_extraction_arguments, check_ocr, template_from_args
+from invoice_extractor.extraction import resolve_template
+from invoice_extractor.writers import JsonlWriter
+
+POLL_INTERVAL = 2.0
+MAX_UPLOAD_FILES = 1000
+JOB_ID = re.compile(r"^[0-9a-f]+-[0-9a-f]+$")
+
+
+# --------------------------------------------------
+# File-backed Job Queue
+# --------------------------------------------------
+
+class FileQueue:
+    """
+    Job queue kept in a folder. Each job is jobs/<id>/ (its PDFs,
+    status.json and results.jsonl) plus an empty ticket file that moves
+    pending/ -> running/ -> done/. Moves use os.replace, so a claim is
+    atomic and several consumers may share one queue. Ticket names sort by
+    submission time. Tickets a crashed consumer left in running/ go back
+    to pending/ with requeue_running().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        for sub in ("pending", "running", "done", "jobs"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def _ticket(self, state, job_id):
+        return os.path.join(self.directory, state, job_id)
+
+    def job_dir(self, job_id):
+        return os.path.join(self.directory, "jobs", job_id)
+
+    def results_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), "results.jsonl")
+
+    def submit(self, files):
+        """Store [(name, pdf_bytes)] as a new job and queue it. Returns its status dict."""
+        job_id = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.job_dir(job_id))
+        names = []
+        for i, (name, pdf_bytes) in enumerate(files):
+            with open(os.path.join(self.job_dir(job_id), f"{i:05d}.pdf"), "wb") as f:
+                f.write(pdf_bytes)
+            names.append(name)
+        status = {
+            "id": job_id, "status": "queued", "files": names, "processed": 0, "failed": 0, "errors": {},
+            "submitted_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "finished_at": None,
+        }
+        self.write_status(status)
+        open(self._ticket("pending", job_id), "w").close()
+        return status
+
+    def claim(self):
+        """Move the oldest pending job to running/ and return its id, or None if there is none."""
+        for job_id in sorted(os.listdir(os.path.join(self.directory, "pending"))):
+            try:
+                os.replace(self._ticket("pending", job_id), self._ticket("running", job_id))
+            except FileNotFoundError:
+                continue  # claimed by another consumer
+            return job_id
+        return None
+
+    def finish(self, job_id):
+        os.replace(self._ticket("running", job_id), self._ticket("done", job_id))
+
+    def requeue_running(self):
+        for job_id in os.listdir(os.path.join(self.directory, "running")):
+            os.replace(self._ticket("running", job_id), self._ticket("pending", job_id))
+
+    def inputs(self, job_id, names):
+        return [(name, os.path.join(self.job_dir(job_id), f"{i:05d}.pdf")) for i, name in enumerate(names)]
+
+    def status(self, job_id):
+        try:
+            with open(os.path.join(self.job_dir(job_id), "status.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_status(self, status):
+        # Written aside and moved into place, so readers never see half a file
+        path = os.path.join(self.job_dir(status["id"]), "status.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(status, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+# --------------------------------------------------
+# Worker Pool
+# --------------------------------------------------
+
+def _warm_worker(template):
+    ignore_sigint()
+    # Compiled once per worker; every request reuses it
+    resolve_template(template)
+
+
+def _ping():
+    return os.getpid()
+
+
+def start_pool(max_workers, template=None):
+    """Fork the extraction workers now and wait until each has imported the stack and compiled the template."""
+    resolve_template(template)  # in the parent too, so forked workers inherit it
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_worker, initargs=(template,))
+    for future in [pool.submit(_ping) for _ in range(max_workers)]:
+        future.result()
+    return pool
+
+
+def open_workers(max_workers, template=None):
+    """The service's pool with what restart_pool() needs to replace it: {"pool", "max_workers", "restart"}."""
+    return {"pool": start_pool(max_workers, template), "max_workers": max_workers, "restart": asyncio.Lock()}
+
+
+async def restart_pool(workers, broken, template):
+    """Replace a broken pool with a fresh warm one, once however many requests saw it break. Returns the live pool."""
+    async with workers["restart"]:
+        if workers["pool"] is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            workers["pool"] = await asyncio.to_thread(start_pool, workers["max_workers"], template)
+    return workers["pool"]
+
+
+async def _run_one(workers, template, job, *args):
+    pool = workers["pool"]
+    try:
+        future = pool.submit(run_one, job, *args)
+    except BrokenProcessPool:
+        # Broken by an earlier file; this one never ran, so it goes to the new pool
+        pool = await restart_pool(workers, pool, template)
+        future = pool.submit(run_one, job, *args)
+    try:
+        await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        # A worker died (out of memory, a native crash) with this file in the
+        # pool: it gets an error result and the next files a fresh pool
+        await restart_pool(workers, pool, template)
+    return collect_result(future, job)
+
+
+async def run_in_pool(workers, name, pdf_bytes, template, backend, ocr, ocr_cache=None):
+    job = (name, pdf_bytes)
+    result = await _run_one(workers, template, job, None, template, backend)
+    if ocr and result["scanned"]:
+        result = await _run_one(workers, template, job, None, template, backend, False, True, ocr_cache)
+    return result
+
+
+async def run_job(queue, job_id, workers, slots, template, backend, ocr, ocr_cache=None):
+    """
+    Extract every PDF of a claimed job, at most `slots` at a time, appending
+    rows to results.jsonl as they finish. Each row carries the file's
+    "Index" in the job's files, since names may repeat.
+    """
+    status = queue.status(job_id)
+    # Counts start over when a job is requeued after a crash
+    status.update(status="running", processed=0, failed=0, errors={})
+    queue.write_status(status)
+    limit = asyncio.Semaphore(slots)
+
+    async def one(index, name, path):
+        async with limit:
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+            return index, name, await run_in_pool(workers, name, pdf_bytes, template, backend, ocr, ocr_cache)
+
+    inputs = queue.inputs(job_id, status["files"])
+    with JsonlWriter(queue.results_path(job_id)) as writer:
+        for task in asyncio.as_completed([one(i, name, path) for i, (name, path) in enumerate(inputs)]):
+            index, name, result = await task
+            if result["error"]:
+                status["failed"] += 1
+                # Keyed by position in "files": uploads may share a name
+                status["errors"][str(index)] = result["error"]
+            else:
+                writer.write({"Index": index, "Source File": name, **result["data"]})
+            status["processed"] += 1
+            queue.write_status(status)
+
+    status["status"] = "done"
+    status["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    queue.write_status(status)
+    queue.finish(job_id)
+
+
+async def run_jobs(queue, wake, workers, slots, template, backend, ocr, ocr_cache=None):
+    """Consume the queue until cancelled, one job at a time; `wake` is set when a job is submitted."""
+    while True:
+        job_id = queue.claim()
+        if job_id is None:
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await run_job(queue, job_id, workers, slots, template, backend, ocr, ocr_cache)
+        except Exception as e:
+            status = queue.status(job_id)
+            status.update(status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            queue.write_status(status)
+            queue.finish(job_id)
+
+
+# --------------------------------------------------
+# HTTP App
+# --------------------------------------------------
+
+def create_app(queue_dir, template=None, backend=None, max_workers=None, job_slots=None, ocr=False, ocr_cache=None):
+    """
+    Starlette app serving the endpoints above. The pool is started (and
+    jobs left running by a previous process are requeued) on startup.
+    job_slots defaults to half the workers, at least one; the pool is grown
+    to job_slots + 1 workers if needed so /extract always has one free.
+    OCR'd pages are cached in ocr_cache (default: queue_dir/ocr_cache.sqlite).
+    """
+    from starlette.applications import Starlette  # optional dependency, only needed for the service
+    from starlette.responses import FileResponse, JSONResponse
+    from starlette.routing import Route
+
+    max_workers = max_workers or os.cpu_count() or 1
+    job_slots = job_slots or max(1, max_workers // 2)
+    max_workers = max(max_workers, job_slots + 1)
+    queue = FileQueue(queue_dir)
+    ocr_cache = ocr_cache or os.path.join(queue_dir, "ocr_cache.sqlite")
+    state = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        queue.requeue_running()
+        workers = state["workers"] = open_workers(max_workers, template)
+        state["wake"] = asyncio.Event()
+        runner = asyncio.create_task(
+            run_jobs(queue, state["wake"], workers, job_slots, template, backend, ocr, ocr_cache)
+        )
+        try:
+            yield
+        finally:
+            runner.cancel()
+            workers["pool"].shutdown(cancel_futures=True)
+
+    async def extract(request):
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            async with request.form(max_files=1) as form:
+                upload = form.get("file")
+                if upload is None or isinstance(upload, str):
+                    return JSONResponse({"error": "Send the PDF as the multipart field \"file\""}, status_code=400)
+                name, pdf_bytes = upload.filename or "upload.pdf", await upload.read()
+        else:
+            name, pdf_bytes = request.query_params.get("name", "upload.pdf"), await request.body()
+        if not pdf_bytes:
+            return JSONResponse({"error": "Empty request body"}, status_code=400)
+
+        result = await run_in_pool(state["workers"], name, pdf_bytes, template, backend, ocr, ocr_cache)
+        body = {"file": name, "data": result["data"], "error": result["error"], "timings": result["timings"]}
+        return JSONResponse(body, status_code=422 if result["error"] else 200)
+
+    async def submit_job(request):
+        async with request.form(max_files=MAX_UPLOAD_FILES) as form:
+            uploads = [u for u in form.getlist("files") if not isinstance(u, str)]
+            if not uploads:
+                return JSONResponse({"error": "Send the PDFs as multipart fields \"files\""}, status_code=400)
+            files = [(u.filename or f"upload_{i}.pdf", await u.read()) for i, u in enumerate(uploads)]
+        status = await asyncio.to_thread(queue.submit, files)
+        state["wake"].set()
+        return JSONResponse(status, status_code=202)
+
+    def job_status(request):
+        job_id = request.path_params["job_id"]
+        status = queue.status(job_id) if JOB_ID.match(job_id) else None
+        if status is None:
+            return JSONResponse({"error": f"No job {job_id}"}, status_code=404)
+        return JSONResponse(status)
+
+    def job_results(request):
+        job_id = request.path_params["job_id"]
+        status = queue.status(job_id) if JOB_ID.match(job_id) else None
+        if status is None:
+            return JSONResponse({"error": f"No job {job_id}"}, status_code=404)
+        if status["status"] != "done":
+            return JSONResponse(status, status_code=409)
+        return FileResponse(queue.results_path(job_id), media_type="application/x-ndjson",
+                            filename=f"{job_id}.jsonl")
+
+    def health(request):
+        return JSONResponse({"status": "ok", "workers": max_workers, "job_slots": job_slots})
+
+    return Starlette(
+        routes=[
+            Route("/extract", extract, methods=["POST"]),
+            Route("/jobs", submit_job, methods=["POST"]),
+            Route("/jobs/{job_id}", job_status),
+            Route("/jobs/{job_id}/results", job_results),
+            Route("/health", health),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m invoice_extractor.service",
+        description="Serve invoice extraction over HTTP.",
+    )
+    parser.add_argument("-q", "--queue-dir", default=os.path.join("output", "queue"),
+                        help="Folder holding queued batch jobs and their results (default: output/queue)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_extraction_arguments(parser, "<queue-dir>/ocr_cache.sqlite")
+    parser.add_argument("--job-slots", type=int, default=None,
+                        help="Workers batch jobs may use at once (default: half of them); at least one more always serves /extract")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn  # optional dependency, only needed for the service
+    except ImportError:
+        print("The service needs starlette and uvicorn (pip install starlette uvicorn python-multipart).", file=sys.stderr)
+        return 2
+    if not check_ocr(args):
+        return 2
+
+    app = create_app(args.queue_dir, template=template_from_args(args), backend=args.backend, max_workers=args.workers,
+                     job_slots=args.job_slots, ocr=args.ocr, ocr_cache=args.ocr_cache)
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from invoice_extractor.anchors import AnchorIndex
+from invoice_extractor.calibration import CALIBRATION_SEARCH, calibrate, to_template_space
+from invoice_extractor.instrumentation import stage
+from invoice_extractor.word_index import BOX_GROUP, WordIndex, box_array
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+DEFAULT_TEMPLATE = os.path.join(TEMPLATE_DIR, "invoice_v1.json")
+
+# Columns of CompiledTemplate.rects
+X_START, X_END, TOP_MIN, TOP_MAX, BOTTOM_MAX = range(5)
+
+PAGE_SELECTORS = ("first", "last", "every")
+
+# Fields scoring below this are re-extracted, and listed under LOW_CONFIDENCE if still below
+MIN_CONFIDENCE = 0.6
+LOW_CONFIDENCE = "Low Confidence"
+# Word tops further apart than this (pt) are on different text lines
+LINE_SPREAD = 2
+# Re-extraction looks this many tolerances around a line field's y, and
+# scales what it finds there by REFINE_PENALTY (it is a guess)
+REFINE_WIDEN = 2
+REFINE_PENALTY = 0.8
+
+# Padding (points) around the union of a page's regions when only that area
+# is parsed; covers word heights below a line field's y and glyphs that
+# straddle a region's edge
+CLIP_MARGIN = 24
+
+
+def read_definition(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # optional dependency, only needed for YAML templates
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def page_targets(selector, page_count):
+    """0-based page numbers a "page" selector refers to in a document of page_count pages."""
+    if selector == "first":
+        targets = [0]
+    elif selector == "last":
+        targets = [page_count - 1]
+    elif selector == "every":
+        targets = range(page_count)
+    else:
+        targets = [selector - 1]
+    return [p for p in targets if 0 <= p < page_count]
+
+
+def line_confidence(top, y, tol):
+    """
+    Score in [0, 1] for the tops of the words a line field matched: 0
+    without words, at most 0.5 when they span more than one text line (a
+    neighbouring line was caught), and down to 0.6 as they drift from the
+    expected y towards the edge of the tolerance.
+    """
+    # Plain lists: fields match a handful of words, too few for NumPy to pay off
+    top = sorted(top)
+    if not top:
+        return 0.0
+    score = 1.0 - 0.4 * min(abs(top[len(top) // 2] - y) / tol, 1.0)
+    if top[-1] - top[0] > LINE_SPREAD:
+        score *= 0.5
+    return score
+
+
+def check_page(selector, name):
+    if not (selector in PAGE_SELECTORS or isinstance(selector, int)):
+        raise ValueError(f"Unknown page {selector!r} for {name!r}")
+
+
+class CompiledTable:
+    """
+    A line-item table: words between y[0] and y[1] are clustered into rows
+    by baseline and into columns by the columns' left edges, in one sweep
+    over the words sorted by (bottom, x0).
+
+    Definition keys: "name", "y": [top, bottom], "columns": [{"name", "x"}]
+    with x the column's left edge (ascending), optional "x_end" (right edge
+    of the last column), "row_tol" (baseline gap that starts a new row,
+    default 3), "page" (as for fields) and "key": a column every item has
+    (e.g. the amount). A line with nothing in the key column is a wrapped
+    continuation of the row above and is merged into it.
+    """
+
+    def __init__(self, definition):
+        self.name = definition["name"]
+        self.page = definition.get("page", "first")
+        check_page(self.page, self.name)
+        self.y_start, self.y_end = definition["y"]
+        self.columns = [c["name"] for c in definition["columns"]]
+        self.edges = np.array([c["x"] for c in definition["columns"]], dtype=float)
+        if np.any(np.diff(self.edges) <= 0):
+            raise ValueError(f"Column edges of table {self.name!r} must be ascending")
+        self.x_end = definition.get("x_end", np.inf)
+        self.row_tol = definition.get("row_tol", 3)
+        self.key_column = None
+        if definition.get("key") is not None:
+            if definition["key"] not in self.columns:
+                raise ValueError(f"Key column {definition['key']!r} is not a column of table {self.name!r}")
+            self.key_column = self.columns.index(definition["key"])
+
+    def extract(self, index, matrix=None):
+        """
+        Returns (rows, boxes): one {column: text} dict per item and the
+        box_array() of every word used, grouped by cell (row x column, from
+        0). matrix is the page's calibration (template -> page), if any.
+        """
+        if matrix is None:
+            lo, hi = index.band_range(self.y_start, self.y_end)
+            x0, top, bottom = index.x0[lo:hi], index.top[lo:hi], index.bottom[lo:hi]
+        else:
+            lo = 0
+            x0, top, bottom = to_template_space(matrix, index.x0, index.top, index.bottom)
+        if not len(x0):
+            return [], index.boxes([])
+        column = np.searchsorted(self.edges, x0, side="right") - 1
+        keep = (column >= 0) & (x0 <= self.x_end) & (top >= self.y_start) & (top <= self.y_end)
+
+        lines = []
+        line_bottom = None
+        for j in np.lexsort((x0, bottom)):
+            if not keep[j]:
+                continue
+            if line_bottom is None or bottom[j] - line_bottom > self.row_tol:
+                lines.append([[] for _ in self.columns])
+                line_bottom = bottom[j]
+            lines[-1][column[j]].append(j)
+
+        rows = []
+        for cells in lines:
+            for cell in cells:
+                # Baselines within row_tol may be out of x order
+                cell.sort(key=lambda j: x0[j])
+            if rows and self.key_column is not None and not cells[self.key_column]:
+                for merged, cell in zip(rows[-1], cells):
+                    merged.extend(cell)
+            else:
+                rows.append(cells)
+
+        items = []
+        used = []
+        groups = []
+        for row_no, cells in enumerate(rows):
+            items.append({name: index.join(lo + j for j in cell) for name, cell in zip(self.columns, cells)})
+            for column_no, cell in enumerate(cells):
+                used.extend(lo + j for j in cell)
+                groups.extend([row_no * len(self.columns) + column_no] * len(cell))
+        return items, index.boxes(used, groups)
+
+
+class CompiledTemplate:
+    """
+    A template definition compiled into one (fields x 5) array of region
+    rectangles, so a page is matched against every field in a single
+    broadcast instead of one helper call per field.
+
+    Field types:
+      line  - x0 in x, top within y ± tol; text read left to right
+      block - x0 in x, top >= y[0], bottom <= y[1] (top <= y[1] when
+              "within" is false); text read top to bottom
+
+    Each field may also set "page": "first" (default), "last", "every" or a
+    1-based page number. Only pages some field refers to are ever read.
+
+    Fields may declare a "kind" (money, date, email, phone, weight) and
+    the template a list of "checks"; both are only used by normalize.py.
+
+    Every field gets a confidence score: line_confidence() for lines, 1
+    or 0 for blocks depending on whether they matched anything ("optional":
+    true blocks and lines score 1 when empty). Fields below MIN_CONFIDENCE
+    are re-extracted: the text line nearest the expected y within
+    REFINE_WIDEN tolerances, or the words right of the field's printed
+    "label" (e.g. "Tax ($)"), whichever scores best. Fields still below it
+    are listed with their scores in the LOW_CONFIDENCE column.
+
+    Optional "tables" are CompiledTable line-item tables; each one's rows
+    come back as a list of dicts under its name in the extracted dict.
+
+    With "calibrate": true, the template's "anchors" are looked up on each
+    page read and an affine fit (see calibration.py) maps the page's words
+    back into template coordinates before matching, so shifted or slightly
+    scaled scans still land in tight regions.
+    """
+
+    def __init__(self, definition):
+        self.name = definition["name"]
+        self.version = definition.get("version", 1)
+        self.definition = definition
+
+        fields = definition["fields"]
+        self.fields = [f["name"] for f in fields]
+        self.rects = np.empty((len(fields), 5))
+        self.order_by_x = np.zeros(len(fields), dtype=bool)
+        self.pages = [f.get("page", "first") for f in fields]
+        self.optional = [bool(f.get("optional", False)) for f in fields]
+        # Expected y and tolerance of line fields, for confidence scoring
+        self.line_y = [f["y"] if f["type"] == "line" else None for f in fields]
+        self.line_tol = [f.get("tol", 6) if f["type"] == "line" else None for f in fields]
+        self.labels = [f.get("label") for f in fields]
+
+        self.tables = [CompiledTable(t) for t in definition.get("tables", [])]
+        # Optional typing / validation, applied by normalize.normalize_frame()
+        self.kinds = {f["name"]: f["kind"] for f in fields if "kind" in f}
+        self.checks = definition.get("checks", [])
+        self.anchors = definition.get("anchors", [])
+        self.calibrate = bool(definition.get("calibrate", False))
+        if self.calibrate and not self.anchors:
+            raise ValueError(f"Template {self.name!r} sets \"calibrate\" but has no anchors")
+
+        for i, f in enumerate(fields):
+            check_page(self.pages[i], f["name"])
+            x_start, x_end = f["x"]
+            if f["type"] == "line":
+                tol = f.get("tol", 6)
+                self.rects[i] = (x_start, x_end, f["y"] - tol, f["y"] + tol, np.inf)
+                self.order_by_x[i] = True
+            elif f["type"] == "block":
+                y_start, y_end = f["y"]
+                bottom_max = y_end if f.get("within", True) else np.inf
+                self.rects[i] = (x_start, x_end, y_start, y_end, bottom_max)
+            else:
+                raise ValueError(f"Unknown field type {f['type']!r} for field {f['name']!r}")
+
+    @property
+    def key(self):
+        return f"{self.name}:{self.version}"
+
+    @property
+    def digest(self):
+        """Short hash of the definition, so editing a template without bumping its version still changes it."""
+        blob = json.dumps(self.definition, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()[:16]
+
+    def fields_by_page(self, page_count):
+        """{page_no (0-based): [field positions]} for a document with page_count pages."""
+        by_page = {}
+        for i, selector in enumerate(self.pages):
+            for page_no in page_targets(selector, page_count):
+                by_page.setdefault(page_no, []).append(i)
+        return by_page
+
+    def assign(self, x0, top, bottom, rows=slice(None)):
+        """Boolean (fields x words) matrix: True where a word falls in a field's region."""
+        r = self.rects[rows, :, None]
+        return (
+            (x0 >= r[:, X_START]) & (x0 <= r[:, X_END])
+            & (top >= r[:, TOP_MIN]) & (top <= r[:, TOP_MAX])
+            & (bottom <= r[:, BOTTOM_MAX])
+        )
+
+    def extract(self, pages, timings=None):
+        """
+        Run every field against a document. pages is a PageIndexes (or any
+        sequence of WordIndex); a single WordIndex is treated as a one-page
+        document. Returns (extracted, highlight_boxes) with the boxes as one
+        box_array(), grouped by field and table cell. With timings, the run is recorded as the "fields",
+        "refine" (only when some field scored low) and "tables" stages along
+        with per-field match counts (rows per table).
+        """
+        if isinstance(pages, WordIndex):
+            pages = [pages]
+
+        matrices = {}
+        if self.calibrate:
+            with stage(timings, "calibrate"):
+                for page_no in self.pages_read(len(pages)):
+                    matrices[page_no] = calibrate(pages[page_no], self.anchors)
+
+        with stage(timings, "fields"):
+            extracted, boxes_by_field, confidence, match_counts = self._extract(pages, matrices)
+        if timings is not None:
+            for name, count in zip(self.fields, match_counts):
+                timings.matches[name] = count
+
+        # Only the few fields that look wrong pay for the slower lookups
+        low = [i for i, score in enumerate(confidence) if score < MIN_CONFIDENCE]
+        if low:
+            with stage(timings, "refine"):
+                anchors = {}
+                for i in low:
+                    refined = self._refine(i, pages, matrices, anchors)
+                    if refined is not None and refined[2] > confidence[i]:
+                        extracted[self.fields[i]], boxes_by_field[i], confidence[i] = refined
+        extracted[LOW_CONFIDENCE] = ", ".join(
+            f"{name} ({score:.2f})" for name, score in zip(self.fields, confidence) if score < MIN_CONFIDENCE
+        )
+        highlight_boxes = [boxes for field_boxes in boxes_by_field for boxes in field_boxes]
+
+        if self.tables:
+            with stage(timings, "tables"):
+                # Table cells are numbered on from the fields, so each one is highlighted on its own
+                group = len(self.fields)
+                for table in self.tables:
+                    items = []
+                    for page_no in page_targets(table.page, len(pages)):
+                        rows, used = table.extract(pages[page_no], matrices.get(page_no))
+                        used[:, BOX_GROUP] += group
+                        group += len(rows) * len(table.columns)
+                        items.extend(rows)
+                        highlight_boxes.append(used)
+                    extracted[table.name] = items
+                    if timings is not None:
+                        timings.matches[table.name] = len(items)
+        return extracted, np.concatenate(highlight_boxes) if highlight_boxes else box_array([])
+
+    def page_clip(self, page_no, page_count):
+        """
+        (x0, top, x1, bottom) around every region this template reads on a
+        page, so word sources can skip the rest of it; None when it reads
+        nothing there. Words only need their x0 inside a field, so the clip
+        runs to the right page edge. Calibrated templates also cover the
+        anchor search windows and allow for shifts of that size.
+        """
+        boxes = []
+        for (x_start, _, top_min, top_max, _), selector in zip(self.rects, self.pages):
+            if page_no in page_targets(selector, page_count):
+                # A word's bottom is at most CLIP_MARGIN below its top
+                boxes.append((x_start, top_min, top_max))
+        for table in self.tables:
+            if page_no in page_targets(table.page, page_count):
+                boxes.append((table.edges[0], table.y_start, table.y_end))
+        if not boxes:
+            return None
+        if self.calibrate:
+            boxes.extend((a["x"], a["y"], a["y"]) for a in self.anchors)
+
+        margin = CLIP_MARGIN + (CALIBRATION_SEARCH if self.calibrate else 0)
+        x0 = min(b[0] for b in boxes)
+        top = min(b[1] for b in boxes)
+        bottom = max(b[2] for b in boxes)
+        return (float(x0) - margin, float(top) - margin, np.inf, float(bottom) + margin)
+
+    def pages_read(self, page_count):
+        """0-based pages any field or table reads in a document of page_count pages."""
+        pages_read = set(self.fields_by_page(page_count))
+        for table in self.tables:
+            pages_read.update(page_targets(table.page, page_count))
+        return sorted(pages_read)
+
+    def _coordinates(self, index, matrix):
+        if matrix is None:
+            return index.x0, index.top, index.bottom
+        return to_template_space(matrix, index.x0, index.top, index.bottom)
+
+    def _score(self, i, top):
+        if not len(top):
+            return 1.0 if self.optional[i] else 0.0
+        if not self.order_by_x[i]:
+            return 1.0  # blocks: matched something
+        return line_confidence(top, self.line_y[i], self.line_tol[i])
+
+    def _extract(self, pages, matrices):
+        texts_by_field = [[] for _ in self.fields]
+        boxes_by_field = [[] for _ in self.fields]
+        scores_by_field = [[] for _ in self.fields]
+        for page_no, rows in sorted(self.fields_by_page(len(pages)).items()):
+            index = pages[page_no]
+            x0, top, bottom = self._coordinates(index, matrices.get(page_no))
+            mask = self.assign(x0, top, bottom, rows)
+
+            for row, i in enumerate(rows):
+                # Index words are in (top, x0) order, so block hits are already in reading order
+                hits = np.flatnonzero(mask[row])
+                if self.order_by_x[i]:
+                    hits = hits[np.argsort(x0[hits], kind="stable")]
+                texts_by_field[i].extend(index.text[j] for j in hits)
+                boxes_by_field[i].append(index.boxes(hits, i))
+                if len(hits):
+                    scores_by_field[i].append(self._score(i, top[hits].tolist()))
+
+        extracted = {name: " ".join(texts) for name, texts in zip(self.fields, texts_by_field)}
+        # A field's confidence is that of its worst page
+        confidence = [min(scores) if scores else self._score(i, ()) for i, scores in enumerate(scores_by_field)]
+        return extracted, boxes_by_field, confidence, [len(texts) for texts in texts_by_field]
+
+    def _refine(self, i, pages, matrices, anchors):
+        """
+        Slower second look at line field i on its first page: returns the
+        best of (text, [boxes], confidence) from a widened search and, with
+        a "label", label anchoring. None for blocks.
+        """
+        targets = page_targets(self.pages[i], len(pages))
+        if not self.order_by_x[i] or not targets:
+            return None
+        page_no = targets[0]
+        index = pages[page_no]
+        x_start, x_end = self.rects[i, X_START], self.rects[i, X_END]
+        y, tol = self.line_y[i], self.line_tol[i]
+        candidates = []
+
+        # The single text line nearest the expected y, in a wider window
+        x0, top, _ = self._coordinates(index, matrices.get(page_no))
+        near = np.flatnonzero((x0 >= x_start) & (x0 <= x_end) & (np.abs(top - y) <= REFINE_WIDEN * tol))
+        if len(near):
+            line_top = top[near[np.argmin(np.abs(top[near] - y))]]
+            hits = near[np.abs(top[near] - line_top) <= LINE_SPREAD]
+            hits = hits[np.argsort(x0[hits], kind="stable")]
+            score = REFINE_PENALTY * line_confidence(top[hits].tolist(), y, REFINE_WIDEN * tol)
+            candidates.append((index.join(hits), [index.boxes(hits, i)], score))
+
+        # The words right of the printed label nearest the expected y
+        if self.labels[i]:
+            if page_no not in anchors:
+                anchors[page_no] = AnchorIndex(index)
+            hits = [h for h in anchors[page_no].find(self.labels[i]) if abs(h["top"] - y) <= CALIBRATION_SEARCH]
+            if hits:
+                hit = min(hits, key=lambda h: abs(h["top"] - y))
+                text, hits = anchors[page_no].right_of(hit, x_end=x_end)
+                candidates.append((text, [index.boxes(hits, i)], line_confidence(index.top[hits].tolist(), hit["top"], tol)))
+
+        return max(candidates, key=lambda c: c[2]) if candidates else None
+
+
+def row_columns(templates):
+    """
+    Column order of the invoice rows written for one or more templates:
+    Source File, Template (when routing between several), every template's
+    fields in turn and LOW_CONFIDENCE. Table results are not included; they
+    go to line-item rows.
+    """
+    columns = ["Source File"]
+    if len(templates) > 1:
+        columns.append("Template")
+    for template in templates:
+        columns.extend(name for name in template.fields if name not in columns)
+    columns.append(LOW_CONFIDENCE)
+    return columns
+
+
+@lru_cache(maxsize=None)
+def load_template(path=None):
+    """Load and compile a JSON/YAML template once per process (default: invoice_v1)."""
+    return CompiledTemplate(read_definition(path or DEFAULT_TEMPLATE))
@@ -0,0 +1,240 @@
+"""
+Watched-folder ingestion: process PDFs continuously as they land in an inbox.
+
+    python -m invoice_extractor.watch inbox/ -o output/
+
+New PDFs are noticed through watchdog (inotify on Linux) when it is
+installed, otherwise by polling the folder. Once a file's size has stopped
+changing it is hashed and queued for the extraction workers. Rows are
+appended to a daily rolling file (output/invoices_YYYYMMDD.csv). Each
+processed hash goes into output/manifest.jsonl, so a restart skips
+everything already extracted, including renamed copies. Failed files are
+retried on the next start (e.g. scans once --ocr is on).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from invoice_extractor.batch import DEFAULT_OCR_WORKERS, collect_result, ignore_sigint, run_one
+from invoice_extractor.cli import add_extraction_arguments, check_ocr, template_from_args
+from invoice_extractor.extraction import resolve_template
+from invoice_extractor.template import row_columns
+from invoice_extractor.writers import RollingWriter, split_line_items
+
+POLL_INTERVAL = 2.0
+
+
+class Manifest:
+    """
+    Append-only JSONL record of processed PDFs ({"sha256", "file", "error",
+    "processed_at"}), reloaded on start. Entries are written after the row,
+    so a crash in between reprocesses that one file rather than losing it.
+    Only successful entries are skipped; failed ones stay retryable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hashes = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get("error") is None:
+                            self.hashes.add(entry["sha256"])
+                    except (ValueError, KeyError, AttributeError):
+                        continue  # torn last line after a crash
+        self._f = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, digest):
+        return digest in self.hashes
+
+    def add(self, digest, name, error=None):
+        if error is None:
+            self.hashes.add(digest)
+        entry = {"sha256": digest, "file": name, "error": error, "processed_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def start_observer(inbox, events):
+    """Push created/moved/modified paths into events via watchdog; None if watchdog is not installed."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:  # optional dependency: fall back to polling
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if not event.is_directory:
+                events.put(getattr(event, "dest_path", None) or event.src_path)
+
+    observer = Observer()
+    observer.schedule(Handler(), inbox, recursive=False)
+    observer.start()
+    return observer
+
+
+def list_pdfs(inbox):
+    return [entry.path for entry in os.scandir(inbox) if entry.is_file() and entry.name.lower().endswith(".pdf")]
+
+
+def watch(inbox, output_dir, template=None, backend=None, fmt="csv", max_workers=None,
+          highlight_dir=None, ocr=False, ocr_cache=None, poll_interval=POLL_INTERVAL, once=False, stop=None, log=print):
+    """
+    Process every PDF in inbox, then keep watching it until stop (a
+    threading.Event) is set or, with once=True, until the current contents
+    are done. Returns the number of files processed.
+
+    At most 2 x max_workers files are read into memory and queued at a time.
+    With ocr=True, scans are retried in a separate OCR pool, as in iter_batch(),
+    and OCR'd pages are cached in ocr_cache (default: output_dir/ocr_cache.sqlite).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    ocr_cache = ocr_cache or os.path.join(output_dir, "ocr_cache.sqlite")
+    max_workers = max_workers or os.cpu_count() or 1
+    manifest = Manifest(os.path.join(output_dir, "manifest.jsonl"))
+    resolved = resolve_template(template)
+    # A new daily CSV must have every template's fields, not just the first row's
+    columns = row_columns(getattr(resolved, "templates", [resolved]))
+    rows = RollingWriter(output_dir, "invoices", fmt, columns=columns)
+    items = RollingWriter(output_dir, "line_items", fmt)
+
+    events = queue.Queue()
+    observer = None if once else start_observer(inbox, events)
+    log(f"Watching {inbox} ({'watchdog' if observer else 'polling'})")
+
+    pending = {}    # path -> (size, mtime) at the last look, until it stops changing
+    handled = {}    # path -> (size, mtime) when it was queued
+    inflight = {}   # future -> (digest, name, pdf_bytes)
+    queued = set()  # digests of inflight jobs
+    processed = 0
+
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=ignore_sigint)
+    ocr_pool = ProcessPoolExecutor(max_workers=DEFAULT_OCR_WORKERS, initializer=ignore_sigint) if ocr else None
+    try:
+        for path in list_pdfs(inbox):
+            pending[path] = None
+        while True:
+            if observer is None:
+                for path in list_pdfs(inbox):
+                    pending.setdefault(path, None)
+            while not events.empty():
+                path = events.get()
+                if path.lower().endswith(".pdf") and os.path.dirname(os.path.abspath(path)) == os.path.abspath(inbox):
+                    pending.setdefault(path, None)
+
+            for path in list(pending):
+                if len(inflight) >= 2 * max_workers:
+                    break  # the rest stay pending until workers free up
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del pending[path]
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                if handled.get(path) == signature:
+                    del pending[path]
+                    continue
+                # Still being copied in (or first look): wait until size and mtime hold still
+                if pending[path] != signature and not once:
+                    pending[path] = signature
+                    continue
+                del pending[path]
+                handled[path] = signature
+
+                with open(path, "rb") as f:
+                    pdf_bytes = f.read()
+                digest = hashlib.sha256(pdf_bytes).hexdigest()
+                name = os.path.basename(path)
+                if digest in manifest or digest in queued:
+                    log(f"SKIP {name}: already processed")
+                    continue
+                future = pool.submit(run_one, (name, pdf_bytes), highlight_dir, template, backend)
+                inflight[future] = (digest, name, pdf_bytes)
+                queued.add(digest)
+
+            for future in [f for f in inflight if f.done()]:
+                digest, name, pdf_bytes = inflight.pop(future)
+                result = collect_result(future, (name, pdf_bytes))
+                if ocr_pool is not None and result["scanned"]:
+                    retry = ocr_pool.submit(
+                        run_one, (name, pdf_bytes), highlight_dir, template, backend, False, True, ocr_cache
+                    )
+                    inflight[retry] = (digest, name, pdf_bytes)
+                    continue
+                queued.discard(digest)
+                if result["error"]:
+                    log(f"FAILED {name}: {result['error']}")
+                else:
+                    data, line_items = split_line_items(result["data"], name)
+                    rows.write({"Source File": name, **data})
+                    for item in line_items:
+                        items.write(item)
+                    log(f"OK {name}")
+                manifest.add(digest, name, result["error"])
+                processed += 1
+
+            if once and not inflight and not pending:
+                return processed
+            if stop is not None and stop.is_set():
+                return processed
+            time.sleep(min(poll_interval, 0.2) if inflight else poll_interval)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        pool.shutdown(cancel_futures=True)
+        if ocr_pool is not None:
+            ocr_pool.shutdown(cancel_futures=True)
+        rows.close()
+        items.close()
+        manifest.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m invoice_extractor.watch",
+        description="Continuously extract invoices dropped into a folder.",
+    )
+    parser.add_argument("inbox", help="Folder to watch for new PDFs")
+    parser.add_argument("-o", "--output-dir", required=True, help="Rolling results, line items and manifest.jsonl go here")
+    parser.add_argument("-f", "--format", choices=sorted(RollingWriter.APPENDABLE), default="csv", help="Rolling file format (default: csv)")
+    parser.add_argument("--highlight-dir", help="Also write highlighted_<name>.pdf copies into this folder")
+    add_extraction_arguments(parser, "<output-dir>/ocr_cache.sqlite")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help=f"Seconds between checks (default: {POLL_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="Process what is in the inbox now, then exit")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.inbox):
+        print(f"Not a folder: {args.inbox}", file=sys.stderr)
+        return 2
+    if not check_ocr(args):
+        return 2
+    if args.highlight_dir:
+        os.makedirs(args.highlight_dir, exist_ok=True)
+
+    def log(message):
+        print(f"{time.strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+    try:
+        watch(args.inbox, args.output_dir, template=template_from_args(args), backend=args.backend, fmt=args.format,
+              max_workers=args.workers, highlight_dir=args.highlight_dir, ocr=args.ocr, ocr_cache=args.ocr_cache,
+              poll_interval=args.interval, once=args.once, log=log)
+    except KeyboardInterrupt:
+        log("Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import sys
+
+import numpy as np
+
+from invoice_extractor.instrumentation import stage
+
+# Columns of a highlight box array (see box_array)
+BOX_PAGE, BOX_X0, BOX_TOP, BOX_X1, BOX_BOTTOM, BOX_GROUP = range(6)
+
+
+class Word:
+    """
+    One word: text, box and 0-based page. Read by attribute or like the
+    pdfplumber dicts it replaces (w["x0"], w.get("page", 0)), with none
+    of the per-word dict overhead.
+    """
+
+    __slots__ = ("text", "x0", "top", "x1", "bottom", "page")
+
+    def __init__(self, text, x0, top, x1, bottom, page=0):
+        self.text = text
+        self.x0 = x0
+        self.top = top
+        self.x1 = x1
+        self.bottom = bottom
+        self.page = page
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"Word({self.text!r}, x0={self.x0:.1f}, top={self.top:.1f}, page={self.page})"
+
+
+def box_array(boxes, group=0):
+    """
+    Highlight boxes as one (n, 6) float32 array of (page, x0, top, x1,
+    bottom, group) rows, from words (Word records or dicts) or an existing
+    array. group is the field (or table cell) the words belong to; only
+    boxes of the same group are merged into one highlight.
+    """
+    if isinstance(boxes, np.ndarray):
+        return boxes
+    return np.array(
+        [(b.get("page", 0), b["x0"], b["top"], b["x1"], b["bottom"], group) for b in boxes], dtype=np.float32
+    ).reshape(-1, 6)
+
+
+class WordIndex:
+    """
+    Columnar page-level word store: float32 coordinate arrays (x0, top,
+    x1, bottom) and interned texts, kept sorted by (top, x0) so a vertical
+    band is found with two bisects instead of scanning the whole page for
+    every field.
+
+    Callers (templates, tables, anchors, the router, the field helpers)
+    read the arrays directly; .words gives Word records for everything
+    else and is only built when first asked for.
+    """
+
+    def __init__(self, words, page=0):
+        words = sorted(words, key=lambda w: (w["top"], w["x0"]))
+        self.page = page
+        self.text = [sys.intern(w["text"]) for w in words]
+        self.x0 = np.array([w["x0"] for w in words], dtype=np.float32)
+        self.top = np.array([w["top"] for w in words], dtype=np.float32)
+        self.x1 = np.array([w["x1"] for w in words], dtype=np.float32)
+        self.bottom = np.array([w["bottom"] for w in words], dtype=np.float32)
+        self._words = None
+
+    def __len__(self):
+        return len(self.text)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = [
+                Word(*row, self.page)
+                for row in zip(self.text, self.x0.tolist(), self.top.tolist(), self.x1.tolist(), self.bottom.tolist())
+            ]
+        return self._words
+
+    def band_range(self, y_start, y_end):
+        """(lo, hi) positions of the words whose top lies in [y_start, y_end]."""
+        return (
+            int(np.searchsorted(self.top, y_start, side="left")),
+            int(np.searchsorted(self.top, y_end, side="right")),
+        )
+
+    def find_text(self, text, x, y, distance):
+        """Positions of the words reading text (case-insensitive) whose x0 and top both lie within distance of (x, y)."""
+        lo, hi = self.band_range(y - distance, y + distance)
+        positions = np.arange(lo, hi)[np.abs(self.x0[lo:hi] - x) <= distance]
+        text = text.lower()
+        return positions[np.array([self.text[j].lower() == text for j in positions], dtype=bool)]
+
+    def boxes(self, positions, group=0):
+        """box_array() rows for the words at the given positions; group is a number or one per position."""
+        positions = np.asarray(positions, dtype=np.intp)
+        page = np.full(len(positions), self.page, dtype=np.float32)
+        group = np.broadcast_to(np.asarray(group, dtype=np.float32), positions.shape)
+        return np.column_stack(
+            (page, self.x0[positions], self.top[positions], self.x1[positions], self.bottom[positions], group)
+        )
+
+    def join(self, positions):
+        return " ".join([self.text[j] for j in positions])
+
+
+class PageIndexes:
+    """
+    Lazily built WordIndex per page of a word source. A page's words are
+    only extracted the first time something asks for that page. Each index
+    knows its 0-based page so highlights land on the right page.
+    Extraction time is recorded as the "words" stage when timings is given.
+
+    clip, if given, is called as clip(page_no, page_count) and returns the
+    (x0, top, x1, bottom) area to read (or None for the whole page), e.g.
+    CompiledTemplate.page_clip. A page whose clip holds no words is read
+    again in full, so scans are still told apart from sparse pages.
+    """
+
+    def __init__(self, source, timings=None, clip=None):
+        self.source = source
+        self.timings = timings
+        self.clip = clip
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, page_no):
+        if page_no not in self._indexes:
+            with stage(self.timings, "words"):
+                area = self.clip(page_no, len(self.source)) if self.clip else None
+                words = self.source.words(page_no, area) if area else []
+                if not words:
+                    words = self.source.words(page_no)
+                self._indexes[page_no] = WordIndex(words, page_no)
+        return self._indexes[page_no]
@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+import time
+
+
+# --------------------------------------------------
+# Row Writers
+# --------------------------------------------------
+# Every writer takes one invoice dict at a time and pushes it to disk
+# straight away, so a long batch never holds all rows in memory and a
+# crash mid-run still leaves the finished rows behind.
+#
+# Header-based formats take their columns from the first row unless given
+# `columns` (see template.row_columns); pass them when rows may differ,
+# e.g. when routing between templates with different fields.
+
+def _json_default(value):
+    # Typed rows (normalize.py) carry timestamps
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonlWriter:
+    def __init__(self, path, append=False, columns=None):
+        # Every line carries its own keys; columns are not needed
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, row):
+        self._f.write(json.dumps(row, ensure_ascii=False, default=_json_default) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter:
+    def __init__(self, path, append=False, columns=None):
+        self._columns = columns
+        header = None
+        if append and os.path.exists(path) and os.path.getsize(path):
+            # Keep appending under the existing file's header
+            with open(path, encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f))
+        self._f = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self._writer = None
+        if header:
+            self._writer = csv.DictWriter(self._f, fieldnames=header, extrasaction="ignore")
+
+    def write(self, row):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._f, fieldnames=list(self._columns or row), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetWriter:
+    """
+    Buffers rows into row groups of row_group_size (needs pyarrow). The
+    schema is fixed by the first row group; columns that are empty there
+    are stored as text.
+    """
+
+    def __init__(self, path, row_group_size=1000, columns=None):
+        import pyarrow  # optional dependency, only needed for Parquet output
+        import pyarrow.parquet
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._path = path
+        self._row_group_size = row_group_size
+        self._columns = columns
+        self._rows = []
+        self._writer = None
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self._row_group_size:
+            self._flush()
+
+    def write_frame(self, frame):
+        """Write a typed DataFrame (see normalize.normalize_frame) with its column types intact."""
+        self._flush()
+        table = self._pa.Table.from_pandas(frame, schema=self._writer.schema if self._writer else None, preserve_index=False)
+        self._write_table(table)
+
+    def _flush(self):
+        if not self._rows:
+            return
+        rows = self._rows
+        if self._columns and self._writer is None:
+            # from_pylist takes the columns from the first row
+            rows = [{name: row.get(name) for name in self._columns} for row in rows]
+        table = self._pa.Table.from_pylist(rows, schema=self._writer.schema if self._writer else None)
+        self._write_table(table)
+        self._rows = []
+
+    def _write_table(self, table):
+        if self._writer is None:
+            schema = table.schema
+            for i, field in enumerate(schema):
+                if self._pa.types.is_null(field.type):
+                    # All empty so far; later row groups would fail to cast text to null
+                    schema = schema.set(i, field.with_type(self._pa.string()))
+            table = table.cast(schema)
+            self._writer = self._pq.ParquetWriter(self._path, schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ExcelWriter:
+    """
+    openpyxl write-only workbook: appended rows are streamed to a temp
+    file instead of building the sheet in memory. The .xlsx itself is only
+    complete after close(), so pair it with a CsvWriter when partial
+    results must survive a crash.
+
+    write(row, sheet="Line Items") appends to a further sheet, created on
+    first use with its own header (columns only apply to the main sheet).
+    """
+
+    def __init__(self, path, sheet_name="Sheet1", columns=None):
+        from openpyxl import Workbook
+
+        self._path = path
+        self._wb = Workbook(write_only=True)
+        self._sheet_name = sheet_name
+        self._sheets = {sheet_name: self._wb.create_sheet(sheet_name)}
+        self._headers = {}
+        self._columns = columns
+
+    def write(self, row, sheet=None):
+        sheet = sheet or self._sheet_name
+        if sheet not in self._sheets:
+            self._sheets[sheet] = self._wb.create_sheet(sheet)
+        if sheet not in self._headers:
+            columns = self._columns if sheet == self._sheet_name else None
+            self._headers[sheet] = list(columns or row)
+            self._sheets[sheet].append(self._headers[sheet])
+        self._sheets[sheet].append([row.get(k) for k in self._headers[sheet]])
+
+    def close(self):
+        self._wb.save(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RollingWriter:
+    """
+    Appends rows to <directory>/<prefix>_<period>.<fmt> and moves on to a
+    new file whenever the period (a strftime pattern, daily by default)
+    changes. Only formats that can be appended to are supported.
+    """
+
+    APPENDABLE = {"csv": CsvWriter, "jsonl": JsonlWriter}
+
+    def __init__(self, directory, prefix="invoices", fmt="csv", period="%Y%m%d", columns=None):
+        if fmt not in self.APPENDABLE:
+            raise ValueError(f"Rolling output must be one of {', '.join(self.APPENDABLE)}, not {fmt!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.fmt = fmt
+        self.period = period
+        self.columns = columns
+        self.path = None
+        self._writer = None
+
+    def write(self, row):
+        path = os.path.join(self.directory, f"{self.prefix}_{time.strftime(self.period)}.{self.fmt}")
+        if path != self.path:
+            self.close()
+            self._writer = self.APPENDABLE[self.fmt](path, append=True, columns=self.columns)
+            self.path = path
+        self._writer.write(row)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def split_line_items(data, source_file):
+    """
+    Split one extracted dict into (invoice_row, item_rows). Table results
+    (lists of row dicts) are left out of the invoice row and flattened into
+    item rows tagged with the source file, table name and 1-based line.
+    """
+    row = {}
+    items = []
+    for name, value in data.items():
+        if isinstance(value, list):
+            for line, item in enumerate(value, 1):
+                items.append({"Source File": source_file, "Table": name, "Line": line, **item})
+        else:
+            row[name] = value
+    return row, items
+
+
+WRITERS = {
+    "jsonl": JsonlWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+    "xlsx": ExcelWriter,
+}
+
+
+def open_writer(path, fmt=None, columns=None):
+    """Open a row writer, picking the format from the file extension if fmt is not given."""
+    if fmt is None:
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported output format: {fmt!r} (use one of {', '.join(WRITERS)})")
+    return WRITERS[fmt](path, columns=columns)
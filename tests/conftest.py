@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Run against the working tree, as the benchmarks do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
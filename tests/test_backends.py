@@ -0,0 +1,45 @@
+"""pdfplumber and PyMuPDF must be interchangeable word sources."""
+
+import os
+
+import pytest
+
+from invoice_extractor import extract_pdf, open_source
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SampleInvoice.pdf")
+
+TOLERANCE = 0.1  # points
+# The header's web and email addresses overlap other glyphs, and the two
+# backends split those words differently
+MAX_UNMATCHED = 4
+
+
+def page_words(backend):
+    with open_source(SAMPLE_PDF, backend) as source:
+        return source.words(0)
+
+
+def test_fields_match():
+    reference, _ = extract_pdf(SAMPLE_PDF, backend="pdfplumber")
+    candidate, _ = extract_pdf(SAMPLE_PDF, backend="pymupdf")
+    assert candidate == reference
+
+
+def test_word_boxes_match():
+    reference = page_words("pdfplumber")
+    candidate = page_words("pymupdf")
+    assert len(candidate) == len(reference)
+
+    by_text = {}
+    for w in candidate:
+        by_text.setdefault(w["text"], []).append(w)
+    unmatched = 0
+    for w in reference:
+        options = by_text.get(w["text"])
+        if not options:
+            unmatched += 1
+            continue
+        best = min(options, key=lambda c: abs(c["x0"] - w["x0"]) + abs(c["top"] - w["top"]))
+        for k in ("x0", "top", "x1", "bottom"):
+            assert best[k] == pytest.approx(w[k], abs=TOLERANCE), (w["text"], k)
+    assert unmatched <= MAX_UNMATCHED
@@ -0,0 +1,41 @@
+"""The result cache: content-hash keys and least-recently-used eviction."""
+
+import itertools
+import types
+
+import invoice_extractor.cache
+from invoice_extractor import ResultCache, cache_key, load_template
+
+PDF = b"x" * 100
+
+
+def test_cache_key():
+    template = load_template()
+    assert cache_key(b"%PDF-a", template) == cache_key(b"%PDF-a", template)
+    assert cache_key(b"%PDF-a", template) != cache_key(b"%PDF-b", template)
+
+
+def test_least_recently_used_is_evicted(tmp_path, monkeypatch):
+    # A clock that always moves on, so last_used never ties
+    clock = itertools.count()
+    monkeypatch.setattr(invoice_extractor.cache, "time", types.SimpleNamespace(time=lambda: next(clock)))
+    # Room for three entries (about 120 bytes each), not four
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=400)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"Invoice #": key}, PDF)
+    assert cache.get("a") == ({"Invoice #": "a"}, PDF)  # "b" is now the oldest
+
+    cache.put("d", {"Invoice #": "d"}, PDF)
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ("a", "c", "d")] == [True, True, True]
+    cache.close()
+
+
+def test_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache(path)
+    cache.put("a", {"Invoice #": "1"})
+    cache.close()
+    cache = ResultCache(path)
+    assert cache.get("a") == ({"Invoice #": "1"}, None)
+    cache.close()
@@ -0,0 +1,59 @@
+"""Anchor calibration recovers pages that are shifted or slightly scaled."""
+
+import copy
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import drift_page, make_invoice
+from invoice_extractor import CompiledTemplate, PageIndexes, extract_pdf, fit_affine, load_template, open_source
+from invoice_extractor.calibration import calibrate
+
+DRIFTS = [(6, -5, 1.0), (-8, 9, 1.0), (4, 4, 0.98), (-3, 7, 1.015)]
+SEEDS = range(3)
+
+
+def uncalibrated(template):
+    definition = copy.deepcopy(template.definition)
+    definition["calibrate"] = False
+    return CompiledTemplate(definition)
+
+
+def fields_match(extracted, expected):
+    return all(extracted[name] == value for name, value in expected.items())
+
+
+def test_fit_affine():
+    template_points = np.array([[40.0, 130.0], [300.0, 140.0], [350.0, 500.0], [40.0, 560.0]])
+    matrix = np.array([[0.98, 0.0, 4.0], [0.0, 0.98, -3.0]])
+    page_points = template_points @ matrix[:, :2].T + matrix[:, 2]
+    assert fit_affine(template_points, page_points) == pytest.approx(matrix)
+    # Fewer than three pairs: mean translation only
+    shift = fit_affine(template_points[:2], template_points[:2] + (5.0, -2.0))
+    assert shift == pytest.approx(np.array([[1.0, 0.0, 5.0], [0.0, 1.0, -2.0]]))
+    assert fit_affine(np.empty((0, 2)), np.empty((0, 2))) is None
+
+
+def test_calibrate_measures_the_drift():
+    template = load_template()
+    pdf, _ = make_invoice(template, seed=0)
+    with open_source(pdf) as source:
+        assert calibrate(PageIndexes(source)[0], template.anchors) is None
+    with open_source(drift_page(pdf, 6, -5, 0.98)) as source:
+        matrix = calibrate(PageIndexes(source)[0], template.anchors)
+    assert matrix[:, :2] == pytest.approx(np.diag([0.98, 0.98]), abs=0.005)
+    assert matrix[:, 2] == pytest.approx([6, -5], abs=1.0)
+
+
+@pytest.mark.parametrize("dx, dy, scale", DRIFTS)
+def test_drifted_pages(dx, dy, scale):
+    template = load_template()
+    plain = uncalibrated(template)
+    missed = 0
+    for seed in SEEDS:
+        pdf, expected = make_invoice(template, seed=seed)
+        drifted = drift_page(pdf, dx, dy, scale)
+        assert fields_match(extract_pdf(drifted, template)[0], expected)
+        missed += not fields_match(extract_pdf(drifted, plain)[0], expected)
+    # The drift is large enough that fixed regions alone get fields wrong
+    assert missed
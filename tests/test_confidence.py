@@ -0,0 +1,61 @@
+"""Confidence scores, and re-extraction of the fields that score low."""
+
+import pytest
+
+from invoice_extractor import CompiledTemplate, Timings, WordIndex
+from invoice_extractor.template import LOW_CONFIDENCE, line_confidence
+from invoice_extractor.word_index import BOX_GROUP
+
+TEMPLATE = {
+    "name": "confidence_test",
+    "fields": [
+        {"name": "Invoice #", "type": "line", "x": [100, 200], "y": 100, "tol": 6},
+        {"name": "Total", "type": "line", "x": [100, 200], "y": 200, "tol": 6, "label": "Total"},
+    ],
+}
+
+
+def word(text, x0, top):
+    return {"text": text, "x0": x0, "x1": x0 + 6 * len(text), "top": top, "bottom": top + 10}
+
+
+def extract(words):
+    timings = Timings("test")
+    extracted, boxes = CompiledTemplate(TEMPLATE).extract(WordIndex(words), timings)
+    return extracted, boxes, timings
+
+
+def test_line_confidence():
+    assert line_confidence([], 100, 6) == 0.0
+    assert line_confidence([100], 100, 6) == 1.0
+    assert line_confidence([106], 100, 6) == pytest.approx(0.6)
+    # Words from two text lines: a neighbouring line was caught
+    assert line_confidence([97, 104], 100, 6) == pytest.approx(0.5 * (1 - 0.4 * 4 / 6))
+
+
+def test_confident_fields_skip_refine():
+    extracted, _, timings = extract([word("INV-7", 110, 101), word("Total", 40, 200), word("42.00", 110, 199)])
+    assert extracted["Invoice #"] == "INV-7"
+    assert extracted["Total"] == "42.00"
+    assert extracted[LOW_CONFIDENCE] == ""
+    assert "refine" not in timings.stages
+
+
+def test_refine_recovers_drifted_values():
+    # Both values printed 9 pt below their regions, outside the 6 pt tolerance
+    extracted, boxes, timings = extract([word("INV-7", 110, 109), word("Total", 40, 209), word("42.00", 110, 209)])
+    assert "refine" in timings.stages
+    assert extracted["Invoice #"] == "INV-7"
+    assert extracted["Total"] == "42.00"
+    # Found level with its printed label, so Total is trusted again; the
+    # widened search alone is still a guess
+    assert extracted[LOW_CONFIDENCE] == "Invoice # (0.56)"
+    assert sorted(boxes[:, BOX_GROUP].tolist()) == [0, 1]
+
+
+def test_missing_values_stay_low():
+    extracted, boxes, _ = extract([word("Total", 40, 200)])
+    assert extracted["Invoice #"] == ""
+    assert extracted["Total"] == ""
+    assert extracted[LOW_CONFIDENCE] == "Invoice # (0.00), Total (0.00)"
+    assert len(boxes) == 0
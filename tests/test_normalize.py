@@ -0,0 +1,58 @@
+"""Typed parsing and row validation of extracted text (normalize.py)."""
+
+import math
+
+import pandas as pd
+
+from invoice_extractor import load_template
+from invoice_extractor.normalize import normalize_frame, parse_date, parse_money, parse_phone, template_rules
+
+TOTALS = {"name": "totals", "sum": ["Subtotal", "Tax ($)", "Shipping ($)"], "equals": "Total Amount"}
+MONEY = {"Subtotal": "money", "Tax ($)": "money", "Shipping ($)": "money", "Total Amount": "money"}
+
+
+def test_parse_money():
+    parsed = parse_money(pd.Series(["$1,234.50", "(12.00)", "5686", "n/a", ""]))
+    assert parsed.tolist()[:3] == [1234.5, -12.0, 5686.0]
+    assert parsed.iloc[3:].isna().all()
+
+
+def test_parse_phone():
+    parsed = parse_phone(pd.Series(["+88 (22) 341-2175", "555-0100", "12"]))
+    assert parsed.iloc[0] == "+88223412175"
+    assert parsed.iloc[1] == "5550100"
+    assert pd.isna(parsed.iloc[2])
+
+
+def test_parse_date():
+    parsed = parse_date(pd.Series(["November 13, 2003 10:38", "2003-11-14", "soon"]))
+    assert parsed.iloc[0] == pd.Timestamp("2003-11-13 10:38")
+    assert parsed.iloc[1] == pd.Timestamp("2003-11-14")
+    assert pd.isna(parsed.iloc[2])
+
+
+def test_totals_check():
+    frame = pd.DataFrame([
+        {"Subtotal": "$100.00", "Tax ($)": "8", "Shipping ($)": "2.50", "Total Amount": "$110.50"},
+        {"Subtotal": "$100.00", "Tax ($)": "8", "Shipping ($)": "2.50", "Total Amount": "$120.00"},
+        {"Subtotal": "", "Tax ($)": "8", "Shipping ($)": "2.50", "Total Amount": "$10.50"},
+    ])
+    typed = normalize_frame(frame, MONEY, [TOTALS])
+    assert typed["Valid"].tolist() == [True, False, False]
+    assert typed["Validation"].tolist() == ["", "totals check failed", "totals check failed"]
+    assert math.isclose(typed["Total Amount"].iloc[0], 110.5)
+
+
+def test_unparsed_fields_are_flagged():
+    frame = pd.DataFrame([{"Invoice Date": "yesterday", "Bill To Email": "", "Note": "kept as text"}])
+    typed = normalize_frame(frame, {"Invoice Date": "date", "Bill To Email": "email"})
+    # Empty fields are missing, not invalid
+    assert typed["Validation"].iloc[0] == "Invoice Date: not a date"
+    assert typed["Note"].iloc[0] == "kept as text"
+
+
+def test_template_rules():
+    kinds, checks = template_rules([load_template()])
+    assert kinds["Total Amount"] == "money"
+    assert kinds["Invoice Date"] == "date"
+    assert [check["name"] for check in checks] == ["totals"]
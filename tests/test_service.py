@@ -0,0 +1,51 @@
+"""The service's file-backed job queue and worker pool (no HTTP server needed)."""
+
+import asyncio
+import os
+
+from invoice_extractor.service import FileQueue, open_workers, run_in_pool
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SampleInvoice.pdf")
+
+
+def test_claim_finish_and_requeue(tmp_path):
+    queue = FileQueue(str(tmp_path))
+    first = queue.submit([("a.pdf", b"%PDF-a"), ("a.pdf", b"%PDF-b")])
+    second = queue.submit([("c.pdf", b"%PDF-c")])
+    assert first["status"] == "queued"
+
+    # Oldest first, and each job is handed out once
+    assert queue.claim() == first["id"]
+    assert queue.claim() == second["id"]
+    assert queue.claim() is None
+
+    # Repeated names still get their own input files
+    inputs = queue.inputs(first["id"], first["files"])
+    assert [name for name, _ in inputs] == ["a.pdf", "a.pdf"]
+    assert [open(path, "rb").read() for _, path in inputs] == [b"%PDF-a", b"%PDF-b"]
+
+    queue.finish(first["id"])
+    # A consumer that crashed leaves jobs in running/; they are queued again
+    queue.requeue_running()
+    assert queue.claim() == second["id"]
+    assert queue.claim() is None
+
+    status = queue.status(first["id"])
+    status["status"] = "done"
+    queue.write_status(status)
+    assert queue.status(first["id"])["status"] == "done"
+    assert queue.status("0-missing") is None
+
+
+def test_pool_is_restarted_after_a_worker_dies():
+    workers = open_workers(1)
+    try:
+        broken = workers["pool"]
+        crash = broken.submit(os._exit, 1)
+        assert crash.exception() is not None
+        with open(SAMPLE_PDF, "rb") as f:
+            result = asyncio.run(run_in_pool(workers, "SampleInvoice.pdf", f.read(), None, None, False))
+        assert result["error"] is None
+        assert workers["pool"] is not broken
+    finally:
+        workers["pool"].shutdown()
@@ -0,0 +1,53 @@
+"""Line-item tables: rows clustered by baseline, wrapped lines merged (CompiledTable)."""
+
+from invoice_extractor import CompiledTable, WordIndex
+from invoice_extractor.word_index import BOX_GROUP
+
+TABLE = {
+    "name": "Line Items",
+    "y": [100, 200],
+    "columns": [
+        {"name": "Description", "x": 30},
+        {"name": "Qty", "x": 300},
+        {"name": "Amount", "x": 470},
+    ],
+    "x_end": 570,
+    "key": "Amount",
+}
+
+
+def word(text, x0, bottom):
+    return {"text": text, "x0": x0, "x1": x0 + 6 * len(text), "top": bottom - 8, "bottom": bottom}
+
+
+WORDS = [
+    word("Description", 30, 95),          # header, above the table
+    word("Steel", 30, 120), word("pipe", 62, 120), word("2", 300, 120), word("10.00", 470, 120),
+    word("galvanized", 30, 131),          # wrapped: nothing in the key column
+    # Baselines within row_tol are one row, even when out of x order
+    word("wire", 70, 150), word("Copper", 30, 151.5), word("5", 300, 150.5), word("25.00", 470, 150),
+    word("page", 580, 150),               # right of x_end
+    word("Thank", 30, 230),               # below the table
+]
+
+
+def test_rows_and_wrapped_lines():
+    rows, boxes = CompiledTable(TABLE).extract(WordIndex(WORDS))
+    assert rows == [
+        {"Description": "Steel pipe galvanized", "Qty": "2", "Amount": "10.00"},
+        {"Description": "Copper wire", "Qty": "5", "Amount": "25.00"},
+    ]
+    # One highlight group per cell: row x column
+    assert len(boxes) == 9
+    assert sorted(set(boxes[:, BOX_GROUP].tolist())) == [0, 1, 2, 3, 4, 5]
+
+
+def test_without_key_every_line_is_a_row():
+    rows, _ = CompiledTable({**TABLE, "key": None}).extract(WordIndex(WORDS))
+    assert [row["Description"] for row in rows] == ["Steel pipe", "galvanized", "Copper wire"]
+
+
+def test_empty_table():
+    rows, boxes = CompiledTable(TABLE).extract(WordIndex([word("Total", 30, 300)]))
+    assert rows == []
+    assert len(boxes) == 0
@@ -0,0 +1,53 @@
+"""The built-in invoice_v1 template must keep giving the original app's fields."""
+
+import os
+
+import pytest
+
+from invoice_extractor import BACKENDS, extract_pdf, highlight_pdf
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SampleInvoice.pdf")
+
+ADDRESS = "0412 South Place, 37782 Kensington Point Phoenix, Arizona, 85099 United States"
+DATE = "November 13, 2003 10:38"
+
+# output/invoice_data.xlsx as written by the original FinalApp1.py
+BASELINE = {
+    "Bill To Name": "Lissy Frowing",
+    "Bill To Email": "bfleet0@nifty.com",
+    "Bill To Phone": "+88 (22) 341-2175",
+    "Bill To Address": ADDRESS,
+    "Ship To Name": "Lissy Frowing",
+    "Ship To Email": "bfleet0@nifty.com",
+    "Ship To Phone": "+88 (22) 341-2175",
+    "Ship To Address": ADDRESS,
+    "Est. Ship Date": DATE,
+    "Est. Weight(kg)": "8",
+    "Transportation": "Air",
+    "Carrier": "Quisque id justo sit amet sapien dignissim vestibulum. Vestibulum ante ipsum primis in "
+               "faucibus orci luctus et ultrices posuere cubilia Curae; Nulla dapibus dolor vel est.",
+    "Invoice #": "3",
+    "Invoice Date": DATE,
+    "Due Date": DATE,
+    "Payment Method": "Check",
+    "Shipper Name": "Lissy Frowing",
+    "Shipper Signature": "",
+    "Subtotal": "5686",
+    "Tax ($)": "8",
+    "Shipping ($)": "8",
+    "Total Amount": "5686",
+}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_baseline_fields(backend):
+    extracted, boxes = extract_pdf(SAMPLE_PDF, backend=backend)
+    assert {name: extracted[name] for name in BASELINE} == BASELINE
+    assert extracted["Low Confidence"] == ""
+    assert len(boxes)
+
+
+def test_highlight_roundtrip():
+    _, boxes = extract_pdf(SAMPLE_PDF)
+    highlighted = highlight_pdf(SAMPLE_PDF, boxes)
+    assert highlighted.startswith(b"%PDF")